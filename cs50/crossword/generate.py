@@ -1,6 +1,7 @@
 import sys
 
 from crossword import *
+from wordindex import WordIndex, popcount
 
 
 class CrosswordCreator():
@@ -10,8 +11,10 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+        # Domains are bitsets of word IDs from the index, not sets of words
+        self.index = WordIndex(self.crossword.words)
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.index.all
             for var in self.crossword.variables
         }
 
@@ -100,12 +103,8 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for variable in self.domains:  # Looping through every variable in domains
-            # Making a copy of the list of words so as to not change the size of the set
-            word_list = self.domains[variable].copy()
-            for word in word_list:  # Looping through each word
-                # Checking to see if the word length is not consistent with the length of the variable
-                if len(word) != variable.length:
-                    self.domains[variable].remove(word)  # Removing the word if not consistent
+            # Keeping only the words whose length matches the length of the variable
+            self.domains[variable] &= self.index.of_length(variable.length)
 
     def revise(self, x, y):
         """
@@ -116,25 +115,20 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False  # exists outside the loop because we return revised if at least one change was made
         # using the overlap function to return the coords (i,j) of overlap
         overlap = self.crossword.overlaps[x, y]
-
-        if overlap is not None:
-            i, j = overlap  # unpacking the indicies of the overlap
-            x_words = list(self.domains[x])
-            y_words = list(self.domains[y])
-            for x_word in x_words:  # looping through every word in x's domain
-                match = False  # initative match found variable, we need to reset for each new x_word thus it's inside the loop
-                for y_word in y_words:  # looping through every word in y's domain
-                    if x_word[i] == y_word[j]:  # if x_words's i position letter matches that in y_words's j position letter
-                        match = True  # we have a match and can stop searching through y_words's and move onto the next x_word
-                        break  # we can then exit the loop
-                if not match:
-                    # if no match then we must remove word_x from x's domain
-                    self.domains[x].remove(x_word)
-                    revised = True  # setting revised to true, if there is at least one revision
-
+        if overlap is None:
+            return False
+
+        i, j = overlap  # unpacking the indicies of the overlap
+        # Every x word whose i position letter is the j position letter of some y word,
+        # found one letter at a time instead of comparing every pair of words
+        supported = self.index.supported(self.domains[y], y.length, j, x.length, i)
+        revised_domain = self.domains[x] & supported
+
+        # We made a revision if any word was removed from x's domain
+        revised = revised_domain != self.domains[x]
+        self.domains[x] = revised_domain
         return revised
 
     def ac3(self, arcs=None):
@@ -161,7 +155,7 @@ class CrosswordCreator():
             # Call revise function from above, if it returns true then it means we've just deleted some words from x because they didn't work with y
             if self.revise(x, y):
                 # If, in the process of enforcing arc consistency, you remove all of the remaining values from a domain
-                if len(self.domains[x]) == 0:
+                if self.domains[x] == 0:
                     return False  # Return False
                 # Because x now has fewer words, we must now look at x's neighbors once again
                 for z in self.crossword.neighbors(x):
@@ -233,22 +227,23 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
+        values = self.index.decode(self.domains[var])
         scores = {}  # Initalizing scoring dictionary
-        for value in self.domains[var]:  # Looping through all the values in the domain of 'var'
+        for value in values:  # Looping through all the values in the domain of 'var'
             n = 0  # Initializing counter for number of values ruled out
             neighbors = self.crossword.neighbors(var)  # Finding the neighbors of var
             for neighbor in neighbors:  # For each neighbor of var
                 if neighbor not in assignment:  # Ignoring any variable already present in assignment
                     # Find overlapping indicies between var and neighbor
                     i, j = self.crossword.overlaps[var, neighbor]
-                    # Looping through all the value in the domain of 'neighbor'
-                    for neighbor_word in self.domains[neighbor]:
-                        if value[i] != neighbor_word[j]:  # If letter's don't match we can rule out a word
-                            n = n + 1  # adding 1 to our ruled out count
+                    # The neighbor's words with a different letter at j are ruled out
+                    domain = self.domains[neighbor]
+                    matching = domain & self.index.with_letter(neighbor.length, j, value[i])
+                    n = n + popcount(domain) - popcount(matching)
 
             scores[value] = n
 
-        scores = sorted(self.domains[var], key=lambda word: scores[word])
+        scores = sorted(values, key=lambda word: scores[word])
 
         return scores
 
@@ -267,7 +262,7 @@ class CrosswordCreator():
         scores = {}  # Initalizing scoring dictionary
 
         for value in unassigned:  # Looping through all the values in unassigned
-            mrv = len(self.domains[value])  # Find the current domain size of the value
+            mrv = popcount(self.domains[value])  # Find the current domain size of the value
             n_degree = 0
             for neighbor in self.crossword.neighbors(value):  # For each neighbor of value
                 if neighbor not in assignment:  # Ignoring any variable already present in assignment
@@ -302,7 +297,7 @@ class CrosswordCreator():
         # Looping through all the unassigned variables
         for variable in unassigned:
             # Find the values (words) assocaited with each variable
-            for value in self.domains[variable]:
+            for value in self.index.decode(self.domains[variable]):
                 new_assignment = assignment.copy()  # Make a copy of the original assignment to save
                 # Add the variable, value combo to the new copied assignment
                 new_assignment[variable] = value
@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+
+def popcount(bits):
+    """
+    Return the number of words in the bitset `bits`.
+    """
+    return bin(bits).count("1")
+
+
+def to_bitset(ids, size):
+    """
+    Return an int with bit `i` set for each `i` in `ids`, all below `size`.
+    """
+    buffer = bytearray((size + 7) // 8)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class WordIndex():
+    """
+    Vocabulary numbered in sorted order, so that a set of words can be held
+    as an int with bit `i` set when `words[i]` is in the set.
+
+    `letters[length, position, letter]` is the bitset of words of that
+    length with that letter at that position, which lets arc consistency
+    compare whole domains a letter at a time instead of word by word.
+    """
+
+    def __init__(self, words):
+        self.words = sorted(words)
+        self.all = (1 << len(self.words)) - 1
+
+        lengths = defaultdict(list)
+        letters = defaultdict(list)
+        for i, word in enumerate(self.words):
+            lengths[len(word)].append(i)
+            for position, letter in enumerate(word):
+                letters[len(word), position, letter].append(i)
+
+        size = len(self.words)
+        self.lengths = {
+            length: to_bitset(ids, size) for length, ids in lengths.items()
+        }
+        self.letters = {
+            key: to_bitset(ids, size) for key, ids in letters.items()
+        }
+
+        # Letters occurring at each position of words of each length
+        self.alphabet = defaultdict(list)
+        for length, position, letter in self.letters:
+            self.alphabet[length, position].append(letter)
+
+    def of_length(self, length):
+        return self.lengths.get(length, 0)
+
+    def with_letter(self, length, position, letter):
+        return self.letters.get((length, position, letter), 0)
+
+    def supported(self, bits, length, position, other_length, other_position):
+        """
+        Return the bitset of words of `other_length` whose letter at
+        `other_position` is the letter at `position` of at least one word
+        of `length` in `bits`.
+        """
+        support = 0
+        for letter in self.alphabet[length, position]:
+            if bits & self.letters[length, position, letter]:
+                support |= self.with_letter(other_length, other_position, letter)
+        return support
+
+    def decode(self, bits):
+        """
+        Return the list of words in the bitset `bits`.
+        """
+        words = []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                words.append(self.words[byte_index * 8 + low.bit_length() - 1])
+                byte ^= low
+        return words
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import degrees
+from loader import peak_rss
+from util import QueueFrontier, IndexedQueueFrontier
+
+
+def generate_dataset(directory, n_people, n_movies, alpha=3.0, max_cast=100,
+                     seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv for a synthetic dataset of
+    `n_people` people and `n_movies` movies to `directory`.
+
+    Cast sizes follow a power law with exponent `alpha`, capped at
+    `max_cast`, and cast members are picked by preferential attachment,
+    so a few people star in many movies while most star in one or two,
+    as in the IMDb data.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for p in range(n_people):
+            writer.writerow([p, f"Person {p}", rng.randint(1920, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for m in range(n_movies):
+            writer.writerow([m, f"Movie {m}", rng.randint(1930, 2020)])
+
+    # Every role is remembered so that people are picked again in
+    # proportion to how many roles they already have
+    roles = []
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for m in range(n_movies):
+            cast_size = min(n_people, max_cast,
+                            int(rng.paretovariate(alpha - 1)) + 1)
+            cast = set()
+            while len(cast) < cast_size:
+                if roles and rng.random() < 0.5:
+                    cast.add(rng.choice(roles))
+                else:
+                    cast.add(rng.randrange(n_people))
+            for p in cast:
+                writer.writerow([p, m])
+                roles.append(p)
+
+
+def reset():
+    """
+    Forget everything loaded into `degrees`.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    degrees.graph = None
+    degrees.neighbor_cache.clear()
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def time_queries(pairs, **kwargs):
+    """
+    Return timing of `degrees.shortest_path` over `pairs`, in seconds.
+
+    The neighbor cache is cleared first, so that each strategy starts
+    cold instead of reusing neighbors found by the one timed before it.
+    """
+    degrees.neighbor_cache.clear()
+    times = []
+    connected = 0
+    for source, target in pairs:
+        path, seconds = timed(degrees.shortest_path, source, target, **kwargs)
+        times.append(seconds)
+        connected += path is not None
+    times.sort()
+    return {
+        "queries": len(times),
+        "connected": connected,
+        "total": round(sum(times), 6),
+        "mean": round(sum(times) / len(times), 6),
+        "p50": round(times[len(times) // 2], 6),
+        "max": round(times[-1], 6)
+    }
+
+
+def time_neighbors(person_ids):
+    """
+    Return the time to expand every person in `person_ids` once, with
+    the neighbor cache disabled.
+    """
+    capacity = degrees.neighbor_cache.capacity
+    degrees.neighbor_cache.resize(0)
+    _, seconds = timed(
+        lambda: sum(len(degrees.neighbors_for_person(p)) for p in person_ids)
+    )
+    degrees.neighbor_cache.resize(capacity)
+    return {
+        "people": len(person_ids),
+        "total": round(seconds, 6),
+        "per_person": round(seconds / len(person_ids), 9)
+    }
+
+
+def run(directory, queries, baseline_queries, seed=0):
+    """
+    Benchmark each loader and search strategy against the dataset in
+    `directory` and return the results as a dictionary.
+
+    The original list-backed `QueueFrontier` is quadratic in frontier size,
+    so it only runs the first `baseline_queries` queries.
+    """
+    rng = random.Random(seed)
+    results = {}
+
+    # Use the same queries for every loader, between people with roles
+    reset()
+    degrees.load_data(directory, cache=False)
+    cast = sorted(p for p in degrees.people if degrees.people[p]["movies"])
+    pairs = [(rng.choice(cast), rng.choice(cast)) for _ in range(queries)]
+    sample = rng.sample(cast, min(1000, len(cast)))
+
+    for name, options in [
+        ("dicts", {}),
+        ("compact", {"compact": True})
+    ]:
+        reset()
+        _, load_seconds = timed(degrees.load_data, directory, cache=False,
+                                **options)
+
+        result = {
+            "load_seconds": round(load_seconds, 6),
+            "neighbors": time_neighbors(sample),
+            "bidirectional": time_queries(pairs, bidirectional=True)
+        }
+        if degrees.graph is None:
+            if baseline_queries:
+                result["bfs_queue_frontier"] = time_queries(
+                    pairs[:baseline_queries], frontier_class=QueueFrontier
+                )
+            result["bfs_indexed_frontier"] = time_queries(
+                pairs, frontier_class=IndexedQueueFrontier
+            )
+        else:
+            result["bfs_compact_graph"] = time_queries(pairs)
+        results[name] = result
+
+    reset()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees loading and search on synthetic data."
+    )
+    parser.add_argument("--people", type=int, default=10000)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--alpha", type=float, default=3.0,
+                        help="power-law exponent of cast sizes")
+    parser.add_argument("--max-cast", type=int, default=100,
+                        help="largest cast of any movie")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--baseline-queries", type=int, default=3,
+                        help="queries to run with the original QueueFrontier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", metavar="DIRECTORY",
+                        help="keep the generated CSV files in DIRECTORY")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the JSON report to FILE instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.data or temporary
+        print("Generating data...", file=sys.stderr)
+        generate_dataset(directory, args.people, args.movies,
+                         alpha=args.alpha, max_cast=args.max_cast,
+                         seed=args.seed)
+        print("Running benchmarks...", file=sys.stderr)
+        results = run(directory, args.queries, args.baseline_queries,
+                      seed=args.seed)
+
+    report = {
+        "parameters": {
+            "people": args.people,
+            "movies": args.movies,
+            "alpha": args.alpha,
+            "max_cast": args.max_cast,
+            "queries": args.queries,
+            "baseline_queries": args.baseline_queries,
+            "seed": args.seed
+        },
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss": peak_rss(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
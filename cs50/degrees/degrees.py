@@ -1,7 +1,15 @@
+import argparse
 import csv
+import json
+import multiprocessing
+import os
 import sys
+from collections import defaultdict, deque
 
-from util import Node, StackFrontier, QueueFrontier
+from loader import stream_load
+from nameindex import NameIndex
+from snapshot import read_snapshot, source_signature, write_snapshot
+from util import Node, IndexedQueueFrontier, LRUCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +20,64 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed co-star graph, only built by load_data(compact=True)
+graph = None
 
-def load_data(directory):
+# Most recently used neighbor sets, keyed by person_id
+NEIGHBOR_CACHE_SIZE = 10000
+neighbor_cache = LRUCache(NEIGHBOR_CACHE_SIZE)
+
+# Prefix and fuzzy index over `names`, built on first use by name_index()
+_name_index = None
+
+
+def load_data(directory, compact=False, cache=True, min_year=None,
+              max_year=None, progress=None):
     """
     Load data from CSV files into memory.
+
+    If `compact` is True, the CSV files are read in chunks straight into
+    a `CompactGraph` (see `loader.stream_load`) instead of per-person and
+    per-movie sets, keeping only movies between the optional `min_year`
+    and `max_year` and printing progress to the `progress` file. Giving a
+    year bound implies `compact`.
+
+    If `cache` is True, the loaded data is read from a binary snapshot in
+    `directory` when one matches the current CSV files, and a new snapshot
+    is written after parsing the CSV files otherwise.
     """
+    global graph, _name_index
+    neighbor_cache.clear()
+    _name_index = None
+
+    if min_year is None and max_year is None:
+        kind = "compact" if compact else "full"
+    else:
+        compact = True
+        lower = "" if min_year is None else min_year
+        upper = "" if max_year is None else max_year
+        kind = f"compact-{lower}-{upper}"
+    if cache:
+        signature = source_signature(directory)
+        data = read_snapshot(directory, kind)
+        if data is not None:
+            names.update(data["names"])
+            people.update(data["people"])
+            movies.update(data["movies"])
+            graph = data["graph"]
+            return
+
+    if compact:
+        loaded_names, loaded_people, loaded_movies, graph, _ = stream_load(
+            directory, min_year=min_year, max_year=max_year, progress=progress
+        )
+        names.update(loaded_names)
+        people.update(loaded_people)
+        movies.update(loaded_movies)
+        if cache:
+            _write_snapshot(directory, kind, signature)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,16 +112,63 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    if cache:
+        _write_snapshot(directory, kind, signature)
+
+
+def _write_snapshot(directory, kind, signature):
+    write_snapshot(directory, kind, {
+        "names": names,
+        "people": people,
+        "movies": movies,
+        "graph": graph
+    }, signature)
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", "--stream", action="store_true",
+                        help="read the CSV files in chunks into a compact graph")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="do not read or write the binary snapshot")
+    parser.add_argument("--min-year", type=int,
+                        help="only load movies from this year on (implies --compact)")
+    parser.add_argument("--max-year", type=int,
+                        help="only load movies up to this year (implies --compact)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated source/target pairs from "
+                             "FILE ('-' for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes answering batch queries")
+    parser.add_argument("--neighbor-cache", type=int, metavar="N",
+                        default=NEIGHBOR_CACHE_SIZE,
+                        help="neighbor sets to keep cached (0 disables)")
+    args = parser.parse_args()
+    bidirectional = args.bidirectional
+    neighbor_cache.resize(args.neighbor_cache)
+
+    # Load data from files into memory; keep stdout clean for batch results
+    log = sys.stderr if args.batch else sys.stdout
+    print("Loading data...", file=log)
+    load_data(args.directory, compact=args.compact, cache=args.cache,
+              min_year=args.min_year, max_year=args.max_year,
+              progress=sys.stderr)
+    print("Data loaded.", file=log)
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, workers=args.workers)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, workers=args.workers)
+        print(f"Neighbor cache: {json.dumps(neighbor_cache.stats())}",
+              file=sys.stderr)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +177,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -84,15 +192,25 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False,
+                  frontier_class=IndexedQueueFrontier):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is True, searches from both ends at once
+    and meets in the middle (see `bidirectional_shortest_path`).
+    Otherwise a breadth-first search is run over the compact graph if
+    one is loaded, or with a `frontier_class` frontier if not.
+
     If no possible path, returns None.
     """
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+    if graph is not None:
+        return graph.shortest_path(source, target)
 
-    frontier = QueueFrontier()
+    frontier = frontier_class()
     start = Node(state=source, parent=None, action=None)
     frontier.add(start)
 
@@ -119,6 +237,269 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def shortest_paths(source, targets):
+    """
+    Returns a dictionary mapping each person_id in `targets` to the
+    shortest list of (movie_id, person_id) pairs that connect the
+    source to it, or None if there is no possible path.
+
+    One breadth-first search tree from the source serves all targets.
+    """
+    if graph is not None:
+        return graph.shortest_paths(source, targets)
+
+    # Maps person_id to the (movie_id, person_id) one step closer to source
+    parents = {source: None}
+    remaining = set(targets) - {source}
+    queue = deque([source])
+
+    while remaining and queue:
+        current = queue.popleft()
+        for movie_id, person_id in neighbors_for_person(current):
+            if person_id not in parents:
+                parents[person_id] = (movie_id, current)
+                remaining.discard(person_id)
+                queue.append(person_id)
+
+    paths = {}
+    for target in targets:
+        if target not in parents:
+            paths[target] = None
+            continue
+        path = []
+        person_id = target
+        while parents[person_id] is not None:
+            movie_id, parent_id = parents[person_id]
+            path.append((movie_id, person_id))
+            person_id = parent_id
+        path.reverse()
+        paths[target] = path
+    return paths
+
+
+def parallel_shortest_paths(pairs, workers=None):
+    """
+    Returns a list holding the shortest path for each (source, target)
+    pair in `pairs`, in the same order, as `shortest_path` would.
+
+    Pairs are grouped by source and the groups are spread across a pool
+    of `workers` processes (one per core by default).
+    """
+    by_source = defaultdict(list)
+    for i, (source, target) in enumerate(pairs):
+        by_source[source].append((i, target))
+
+    results = [None] * len(pairs)
+    for source, paths in _paths_by_source(
+        {source: [target for _, target in queries]
+         for source, queries in by_source.items()},
+        workers
+    ):
+        for i, target in by_source[source]:
+            results[i] = paths[target]
+    return results
+
+
+def _paths_by_source(targets_by_source, workers):
+    """
+    Yields (source, paths) for each source in `targets_by_source`, where
+    `paths` maps each of its targets to a shortest path, computed across
+    a pool of `workers` processes.
+
+    Workers share the loaded data: forked workers inherit it for free,
+    while on platforms that must spawn them it is sent to each worker once.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods:
+        context = multiprocessing.get_context("fork")
+        data = None
+    else:
+        context = multiprocessing.get_context()
+        data = (people, movies, graph)
+
+    tasks = list(targets_by_source.items())
+    processes = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * processes))
+    with context.Pool(processes, initializer=_init_worker,
+                      initargs=(data,)) as pool:
+        yield from pool.imap_unordered(_source_paths, tasks, chunksize)
+
+
+def _init_worker(data):
+    global graph
+    if data is not None:
+        loaded_people, loaded_movies, graph = data
+        people.update(loaded_people)
+        movies.update(loaded_movies)
+
+
+def _source_paths(task):
+    source, targets = task
+    return source, shortest_paths(source, targets)
+
+
+def run_batch(lines, out, workers=1):
+    """
+    Answer one query per line of `lines`, each a source and target
+    separated by a tab, where each is a person_id or an unambiguous name.
+
+    Queries are grouped by source so that one search serves all of that
+    source's targets, and groups are spread across `workers` processes
+    when it is more than 1. Each answer is written to `out` as a JSON line
+    holding the input line number, as soon as its source is done.
+    """
+    by_source = defaultdict(list)
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            _write_result(out, {"line": line_number,
+                                "error": "expected source<TAB>target"})
+            continue
+        source, target = (resolve_person(field) for field in fields)
+        if source is None or target is None:
+            missing = fields[0] if source is None else fields[1]
+            candidates = names.get(missing.strip().lower())
+            if candidates:
+                _write_result(out, {"line": line_number,
+                                    "error": f"ambiguous name: {missing}",
+                                    "candidates": sorted(candidates)})
+            else:
+                suggestions = name_index().search(missing, limit=5)
+                _write_result(out, {"line": line_number,
+                                    "error": f"person not found: {missing}",
+                                    "suggestions": people_names(
+                                        [match for match, _ in suggestions])})
+            continue
+        by_source[source].append((line_number, target))
+
+    targets_by_source = {
+        source: [target for _, target in queries]
+        for source, queries in by_source.items()
+    }
+    if workers > 1:
+        results = _paths_by_source(targets_by_source, workers)
+    else:
+        results = (
+            (source, shortest_paths(source, targets))
+            for source, targets in targets_by_source.items()
+        )
+
+    for source, paths in results:
+        for line_number, target in by_source[source]:
+            path = paths[target]
+            result = {"line": line_number, "source": source, "target": target}
+            if path is None:
+                result["degrees"] = None
+                result["path"] = None
+            else:
+                result["degrees"] = len(path)
+                result["path"] = [list(step) for step in path]
+            _write_result(out, result)
+        out.flush()
+
+
+def _write_result(out, result):
+    out.write(json.dumps(result) + "\n")
+
+
+def resolve_person(value):
+    """
+    Returns the person_id for `value`, which may be a person_id or a name
+    matching exactly one person, without prompting. Returns None otherwise.
+    """
+    value = value.strip()
+    if value in people:
+        return value
+    person_ids = names.get(value.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, found by breadth-first
+    search from both the source and the target at once.
+
+    Each round expands one whole layer of whichever side has the smaller
+    frontier, so roughly 2 * b^(d/2) people are explored instead of b^d.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps person_id to (movie_id, person_id) of the neighbor one step
+    # closer to the source (forward) or to the target (backward)
+    forward_parents = {source: None}
+    backward_parents = {target: None}
+    forward_distance = {source: 0}
+    backward_distance = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        # Always grow the smaller side to keep both searches balanced
+        forward = len(forward_frontier) <= len(backward_frontier)
+        if forward:
+            frontier = forward_frontier
+            parents, distance = forward_parents, forward_distance
+            other_distance = backward_distance
+        else:
+            frontier = backward_frontier
+            parents, distance = backward_parents, backward_distance
+            other_distance = forward_distance
+
+        # Expand the whole layer, keeping the shortest meeting point found
+        best = None
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in distance:
+                    continue
+                parents[neighbor_id] = (movie_id, person_id)
+                distance[neighbor_id] = distance[person_id] + 1
+                next_frontier.append(neighbor_id)
+                if neighbor_id in other_distance:
+                    length = distance[neighbor_id] + other_distance[neighbor_id]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor_id)
+
+        if best is not None:
+            return _join_paths(forward_parents, backward_parents, best[1])
+
+        if forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def _join_paths(forward_parents, backward_parents, meeting_id):
+    """
+    Builds the (movie_id, person_id) path through `meeting_id` from the
+    parent maps of a bidirectional search.
+    """
+    path = []
+    person_id = meeting_id
+    while forward_parents[person_id] is not None:
+        movie_id, parent_id = forward_parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting_id
+    while backward_parents[person_id] is not None:
+        movie_id, person_id = backward_parents[person_id]
+        path.append((movie_id, person_id))
+    return path
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -126,6 +507,9 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = [match for match, _ in name_index().search(name, limit=5)]
+        if suggestions:
+            print(f"Did you mean: {', '.join(people_names(suggestions))}?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -145,17 +529,51 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def name_index():
+    """
+    Returns the `NameIndex` over all loaded names, building it if needed.
+    """
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex(names)
+    return _name_index
+
+
+def people_names(lowercase_names):
+    """
+    Returns the names as originally capitalised for a list of
+    lowercase names from `names`.
+    """
+    return [
+        people[next(iter(names[name]))]["name"]
+        for name in lowercase_names
+    ]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
+
+    Results are kept in `neighbor_cache`, so the returned set is shared
+    and must not be modified.
     """
+    return neighbor_cache.get(person_id, _neighbors_for_person)
+
+
+def _neighbors_for_person(person_id):
+    if graph is not None:
+        return frozenset(
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        )
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
         for person_id in movies[movie_id]["stars"]:
             neighbors.add((movie_id, person_id))
-    return neighbors
+    return frozenset(neighbors)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import argparse
+import random
+import sys
+from collections import Counter
+from multiprocessing import Pool
+
+import degrees
+
+# Graph shared with pool workers, set by _init_worker
+_graph = None
+
+
+def distance_histogram(distances):
+    """
+    Return a Counter mapping each number of degrees of separation in
+    `distances` to how many people are that far away. Unconnected people
+    are counted under None.
+    """
+    histogram = Counter(distances)
+    if -1 in histogram:
+        histogram[None] = histogram.pop(-1)
+    return histogram
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _source_histogram(source):
+    return distance_histogram(_graph.distances_from(source))
+
+
+def sampled_histogram(graph, samples, workers=None, seed=None):
+    """
+    Return a Counter of degrees of separation over all pairs of people
+    whose first person is one of `samples` randomly chosen sources.
+
+    Each source's distances are found with one full breadth-first search,
+    and sources are spread across a pool of `workers` processes.
+    """
+    rng = random.Random(seed)
+    sources = rng.sample(range(len(graph)), min(samples, len(graph)))
+
+    histogram = Counter()
+    with Pool(workers, initializer=_init_worker, initargs=(graph,)) as pool:
+        for source_histogram in pool.imap_unordered(
+            _source_histogram, sources, chunksize=max(1, len(sources) // 64)
+        ):
+            histogram.update(source_histogram)
+
+    # Do not count each source's distance to itself
+    histogram[0] -= len(sources)
+    if histogram[0] == 0:
+        del histogram[0]
+    return histogram
+
+
+def write_histogram(histogram, out):
+    """
+    Write `histogram` to `out` as tab-separated degrees and counts,
+    with unconnected pairs last.
+    """
+    total = sum(histogram.values())
+    print("degrees\tcount\tfraction", file=out)
+    for distance in sorted(d for d in histogram if d is not None):
+        count = histogram[distance]
+        print(f"{distance}\t{count}\t{count / total:.6f}", file=out)
+    if histogram.get(None):
+        count = histogram[None]
+        print(f"none\t{count}\t{count / total:.6f}", file=out)
+
+
+def write_distance_table(graph, distances, out):
+    """
+    Write each person's id, name and degrees of separation (blank when not
+    connected) to `out` as tab-separated lines.
+    """
+    print("person_id\tname\tdegrees", file=out)
+    for person, person_id in enumerate(graph.person_ids):
+        distance = distances[person]
+        name = degrees.people[person_id]["name"]
+        print(f"{person_id}\t{name}\t{'' if distance == -1 else distance}",
+              file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute degrees of separation statistics."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--hub", metavar="PERSON",
+                        help="person_id or name to measure everyone against")
+    parser.add_argument("--table", metavar="FILE",
+                        help="write the hub's per-person distance table to FILE")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="number of random sources for the all-pairs histogram")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for sampling (default: one per core)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="do not read or write the binary snapshot")
+    args = parser.parse_args()
+    if not args.hub and not args.samples:
+        parser.error("give --hub, --samples or both")
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True, cache=args.cache)
+    print("Data loaded.", file=sys.stderr)
+    graph = degrees.graph
+
+    if args.hub:
+        hub = degrees.resolve_person(args.hub)
+        if hub is None:
+            sys.exit(f"Person not found: {args.hub}")
+        distances = graph.distances_from(graph.person_index[hub])
+        print(f"Degrees of separation from {degrees.people[hub]['name']}")
+        write_histogram(distance_histogram(distances), sys.stdout)
+        if args.table:
+            with open(args.table, "w", encoding="utf-8") as f:
+                write_distance_table(graph, distances, f)
+
+    if args.samples:
+        histogram = sampled_histogram(
+            graph, args.samples, workers=args.workers, seed=args.seed
+        )
+        samples = min(args.samples, len(graph))
+        print(f"Degrees of separation over {samples} sampled sources")
+        write_histogram(histogram, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+from array import array
+from collections import deque
+
+
+def build_csr(n_rows, rows, cols):
+    """
+    Return (offsets, columns) arrays in compressed sparse row form for
+    `n_rows` rows, given equal-length arrays of row and column indices.
+
+    The columns for row `r` are `columns[offsets[r]:offsets[r + 1]]`.
+    """
+    # Count entries per row, then turn the counts into starting offsets
+    offsets = array("l", [0]) * (n_rows + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for r in range(n_rows):
+        offsets[r + 1] += offsets[r]
+
+    # Place every column at the next free slot of its row
+    columns = array("l", [0]) * len(cols)
+    cursor = array("l", offsets[:-1])
+    for row, col in zip(rows, cols):
+        columns[cursor[row]] = col
+        cursor[row] += 1
+
+    return offsets, columns
+
+
+def dedupe_csr(offsets, columns):
+    """
+    Return (offsets, columns) with repeated columns removed from each row.
+    """
+    new_offsets = array("l", [0]) * len(offsets)
+    new_columns = array("l")
+    for r in range(len(offsets) - 1):
+        row = columns[offsets[r]:offsets[r + 1]]
+        if len(row) > 1:
+            row = array("l", dict.fromkeys(row))
+        new_columns.extend(row)
+        new_offsets[r + 1] = len(new_columns)
+    return new_offsets, new_columns
+
+
+class CompactGraph():
+    """
+    Co-star graph with IMDb ids mapped to dense integers and adjacency
+    stored as arrays in compressed sparse row form, in both directions:
+    person -> movies and movie -> people.
+    """
+
+    def __init__(self, person_ids, movie_ids, star_people, star_movies,
+                 person_index=None, movie_index=None):
+        """
+        Create a graph from lists of person and movie ids and equal-length
+        arrays holding the person index and movie index of each starring
+        role. Repeated roles are dropped.
+
+        `person_index` and `movie_index` map ids back to indices, and are
+        built from the id lists when not given.
+        """
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        self.person_offsets, self.person_movies = dedupe_csr(*build_csr(
+            len(person_ids), star_people, star_movies
+        ))
+
+        # Derive the movie -> people direction from the deduplicated roles
+        star_people = array("l", [0]) * len(self.person_movies)
+        for p in range(len(person_ids)):
+            for k in range(self.person_offsets[p], self.person_offsets[p + 1]):
+                star_people[k] = p
+        self.movie_offsets, self.movie_people = build_csr(
+            len(movie_ids), self.person_movies, star_people
+        )
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def neighbors(self, person):
+        """
+        Yield (movie_index, person_index) pairs for people who starred
+        with person index `person`, including `person` itself.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            for m in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[m]
+
+    def shortest_path(self, source_id, target_id):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect IMDb id `source_id` to `target_id`, or None if they are
+        not connected.
+        """
+        return self.shortest_paths(source_id, [target_id])[target_id]
+
+    def shortest_paths(self, source_id, target_ids):
+        """
+        Returns a dictionary mapping each IMDb id in `target_ids` to the
+        shortest list of (movie_id, person_id) pairs that connects
+        `source_id` to it, or None if they are not connected.
+
+        A single breadth-first search from the source serves every target
+        and stops as soon as all targets have been reached.
+        """
+        source = self.person_index[source_id]
+        remaining = {self.person_index[target_id] for target_id in target_ids}
+        remaining.discard(source)
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        # -1 marks unvisited people; the source is its own parent
+        parent_person = array("l", [-1]) * len(self.person_ids)
+        parent_movie = array("l", [-1]) * len(self.person_ids)
+        parent_person[source] = source
+        seen_movies = set()
+
+        queue = deque([source])
+        while queue and remaining:
+            person = queue.popleft()
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                # Every co-star of a movie is reached the first time it is seen
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for m in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_people[m]
+                    if parent_person[neighbor] != -1:
+                        continue
+                    parent_person[neighbor] = person
+                    parent_movie[neighbor] = movie
+                    remaining.discard(neighbor)
+                    queue.append(neighbor)
+
+        paths = {}
+        for target_id in target_ids:
+            target = self.person_index[target_id]
+            if parent_person[target] == -1:
+                paths[target_id] = None
+            else:
+                paths[target_id] = self._path(parent_person, parent_movie, target)
+        return paths
+
+    def distances_from(self, source):
+        """
+        Return an array holding the number of degrees of separation between
+        person index `source` and every person index, or -1 for people who
+        are not connected to the source.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        distance = array("l", [-1]) * len(self.person_ids)
+        seen_movies = bytearray(len(self.movie_ids))
+        distance[source] = 0
+
+        # Expand one whole layer of people at a time
+        frontier = [source]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for person in frontier:
+                for k in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[k]
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for m in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[m]
+                        if distance[neighbor] == -1:
+                            distance[neighbor] = level
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return distance
+
+    def _path(self, parent_person, parent_movie, target):
+        """
+        Follow parent arrays back from `target` and return the path as
+        (movie_id, person_id) pairs.
+        """
+        path = []
+        person = target
+        while parent_person[person] != person:
+            path.append((self.movie_ids[parent_movie[person]],
+                         self.person_ids[person]))
+            person = parent_person[person]
+        path.reverse()
+        return path
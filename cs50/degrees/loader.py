@@ -0,0 +1,158 @@
+import csv
+import sys
+import time
+from array import array
+from itertools import islice
+
+from graph import CompactGraph
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process in bytes,
+    or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoadStats():
+    """
+    Rows read, elapsed time and peak memory for a streaming load.
+    """
+
+    def __init__(self, out=None):
+        self.out = out
+        self.started = time.perf_counter()
+        self.rows = {}
+
+    def update(self, filename, rows):
+        self.rows[filename] = rows
+        if self.out is not None:
+            elapsed = time.perf_counter() - self.started
+            total = sum(self.rows.values())
+            print(f"{filename}: {rows} rows, {total / elapsed:,.0f} rows/sec, "
+                  f"peak RSS {format_bytes(peak_rss())}", file=self.out)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.rows.values())
+        return {
+            "rows": dict(self.rows),
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(total / elapsed) if elapsed else None,
+            "peak_rss": peak_rss()
+        }
+
+
+def format_bytes(n):
+    if n is None:
+        return "unknown"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def read_chunks(path, fields, chunk_size):
+    """
+    Yield lists of up to `chunk_size` rows from the CSV file at `path`,
+    each row a tuple of the named `fields` in that order.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [header.index(field) for field in fields]
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield [tuple(row[c] for c in columns) for row in chunk]
+
+
+def stream_load(directory, chunk_size=100000, min_year=None, max_year=None,
+                progress=None):
+    """
+    Load the CSV files in `directory` a chunk of rows at a time, building
+    a `CompactGraph` from growing arrays instead of per-row sets.
+
+    Movies outside `min_year`..`max_year` are skipped, along with the
+    roles in them. Progress is printed to `progress` after each chunk.
+
+    Return (names, people, movies, graph, stats) where `people` and
+    `movies` hold only their name/birth and title/year.
+    """
+    stats = LoadStats(progress)
+    names = {}
+    people = {}
+    movies = {}
+
+    rows = 0
+    for chunk in read_chunks(f"{directory}/people.csv",
+                             ("id", "name", "birth"), chunk_size):
+        for person_id, name, birth in chunk:
+            people[person_id] = {"name": name, "birth": birth}
+            names.setdefault(name.lower(), set()).add(person_id)
+        rows += len(chunk)
+        stats.update("people.csv", rows)
+
+    rows = 0
+    for chunk in read_chunks(f"{directory}/movies.csv",
+                             ("id", "title", "year"), chunk_size):
+        for movie_id, title, year in chunk:
+            if not year_in_range(year, min_year, max_year):
+                continue
+            movies[movie_id] = {"title": title, "year": year}
+        rows += len(chunk)
+        stats.update("movies.csv", rows)
+
+    person_ids = list(people)
+    movie_ids = list(movies)
+    person_index = {pid: i for i, pid in enumerate(person_ids)}
+    movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+    # Roles are appended to flat integer arrays as they stream in
+    star_people = array("l")
+    star_movies = array("l")
+    rows = 0
+    for chunk in read_chunks(f"{directory}/stars.csv",
+                             ("person_id", "movie_id"), chunk_size):
+        for person_id, movie_id in chunk:
+            p = person_index.get(person_id)
+            m = movie_index.get(movie_id)
+            if p is not None and m is not None:
+                star_people.append(p)
+                star_movies.append(m)
+        rows += len(chunk)
+        stats.update("stars.csv", rows)
+
+    graph = CompactGraph(person_ids, movie_ids, star_people, star_movies,
+                         person_index=person_index, movie_index=movie_index)
+    return names, people, movies, graph, stats.summary()
+
+
+def year_in_range(year, min_year, max_year):
+    """
+    Return True if `year` lies within the optional bounds. Movies with no
+    year only pass when no bound is given.
+    """
+    if min_year is None and max_year is None:
+        return True
+    try:
+        year = int(year)
+    except ValueError:
+        return False
+    if min_year is not None and year < min_year:
+        return False
+    if max_year is not None and year > max_year:
+        return False
+    return True
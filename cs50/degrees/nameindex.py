@@ -0,0 +1,163 @@
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+
+
+def trigrams(name):
+    """
+    Return the set of three-letter substrings of `name`, padded so that
+    the start and end of each word also form trigrams.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Index over lowercase names for prefix and approximate lookups.
+
+    Prefix queries binary search a sorted list of names. Approximate
+    queries use an inverted index from trigrams to name ids, ranking names
+    by how many trigrams they share with the query.
+
+    Name ids number names by length, so each trigram's postings are in
+    length order too and the names of lengths close to a query's are a
+    slice of them found by binary search.
+    """
+
+    # Approximate queries first look only at names within LENGTH_SLACK
+    # characters of the query's length, widening to all names if none
+    # share a trigram. They count shared trigrams over the RAREST_GRAMS
+    # rarest of the query's trigrams, stopping early once MAX_SCANNED
+    # postings have been read, then score the MAX_CANDIDATES names sharing
+    # the most against every trigram of the query. This bounds lookup
+    # time however common the query's other trigrams are
+    LENGTH_SLACK = 1
+    RAREST_GRAMS = 5
+    MAX_SCANNED = 4000
+    MAX_CANDIDATES = 20
+
+    def __init__(self, names):
+        """
+        Create an index over `names`, any iterable of lowercase names.
+        """
+        self.names = sorted(set(names))
+        self.by_id = sorted(self.names, key=len)
+
+        # length_starts[n] is the first id of a name at least n long
+        self.length_starts = [0]
+        for name_id, name in enumerate(self.by_id):
+            while len(self.length_starts) <= len(name):
+                self.length_starts.append(name_id)
+        self.length_starts.append(len(self.by_id))
+
+        self.gram_counts = []
+        postings = defaultdict(list)
+        for name_id, name in enumerate(self.by_id):
+            grams = trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(name_id)
+        self.postings = dict(postings)
+
+    def prefix(self, query, limit=10):
+        """
+        Return up to `limit` names starting with `query`, in sorted order.
+        """
+        query = query.lower()
+        results = []
+        i = bisect_left(self.names, query)
+        while i < len(self.names) and len(results) < limit:
+            if not self.names[i].startswith(query):
+                break
+            results.append(self.names[i])
+            i += 1
+        return results
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` (name, score) pairs most similar to `query`,
+        best first, where score is the Dice coefficient of their trigrams
+        (1.0 for identical names).
+        """
+        query = query.lower().strip()
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+
+        longest = len(self.length_starts) - 1
+        shortest = max(0, min(longest, len(query) - self.LENGTH_SLACK))
+        low = self.length_starts[shortest]
+        high = self.length_starts[min(longest, len(query) + self.LENGTH_SLACK + 1)]
+        levels = (self._shared(lists, low, high)
+                  or self._shared(lists, 0, len(self.by_id)))
+
+        # Score the names sharing the most of those trigrams against all
+        # of the query's trigrams
+        candidates = set()
+        exact = self._find(query)
+        if exact is not None:
+            candidates.add(exact)
+        for level in reversed(levels):
+            need = self.MAX_CANDIDATES - len(candidates)
+            if need <= 0:
+                break
+            candidates.update(islice(level - candidates, need))
+        scores = (
+            (2 * len(grams & trigrams(self.by_id[name_id]))
+             / (len(grams) + self.gram_counts[name_id]), name_id)
+            for name_id in candidates
+        )
+        best = heapq.nlargest(limit, scores)
+        return [(self.by_id[name_id], round(score, 4)) for score, name_id in best]
+
+    def _find(self, name):
+        """
+        Return the id of `name`, or None if it is not in the index.
+        """
+        if len(name) + 1 >= len(self.length_starts):
+            return None
+        # Names of the same length are in sorted order
+        start = self.length_starts[len(name)]
+        end = self.length_starts[len(name) + 1]
+        i = bisect_left(self.by_id, name, start, end)
+        if i < end and self.by_id[i] == name:
+            return i
+        return None
+
+    def _shared(self, lists, low, high):
+        """
+        Return a list of sets where set `i` holds the name ids from `low` up
+        to `high` appearing in more than `i` of the rarest postings `lists`,
+        or an empty list if there are none.
+        """
+        # The rarest trigrams are the most selective, and a name missing
+        # from all of them cannot share many of the query's trigrams
+        slices = []
+        for postings in lists:
+            start = bisect_left(postings, low)
+            end = bisect_left(postings, high)
+            if start < end:
+                slices.append((end - start, start, end, postings))
+        slices.sort(key=lambda s: s[0])
+
+        levels = []
+        scanned = 0
+        for size, start, end, postings in slices[:self.RAREST_GRAMS]:
+            if scanned and scanned + size > self.MAX_SCANNED:
+                break
+            scanned += size
+            ids = set(postings[start:end])
+            # Names already seen i times that are in this list too have
+            # now been seen i + 1 times
+            for i in range(len(levels), -1, -1):
+                found = ids if i == 0 else levels[i - 1] & ids
+                if not found:
+                    continue
+                if i == len(levels):
+                    levels.append(found)
+                else:
+                    levels[i] |= found
+        return levels
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import degrees
+
+TYPE_NAMES = {str: "a string", int: "an integer"}
+
+
+class ServerStats():
+    """
+    Request counters, queue depth and recent latencies for the server.
+    """
+
+    def __init__(self, window=1000):
+        self.requests = 0
+        self.errors = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=window)
+
+    def start(self):
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        return time.perf_counter()
+
+    def finish(self, started, error=False):
+        self.queue_depth -= 1
+        self.requests += 1
+        if error:
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    def snapshot(self):
+        """
+        Return the counters and latency percentiles (in milliseconds)
+        over the most recent requests as a dictionary.
+        """
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(latencies[index] * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p90": percentile(0.90),
+                "p99": percentile(0.99),
+                "max": percentile(1.0)
+            }
+        }
+
+
+class DegreesServer():
+    """
+    Answers JSON-line requests against data loaded once by `degrees`.
+
+    Each request is one JSON object per line with an "op" of:
+      - "path": {"source", "target"} as person_ids or unambiguous names
+      - "resolve": {"name"}, returning every matching person
+      - "search": {"query", optional "mode" of "fuzzy" or "prefix", "limit"},
+        returning ranked candidate names
+      - "stats": server counters and latency percentiles
+    and gets back one JSON object per line, echoing any "id" it was sent.
+    """
+
+    def __init__(self, workers=4, bidirectional=False):
+        self.stats = ServerStats()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.bidirectional = bidirectional
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle_line(line)
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line):
+        started = self.stats.start()
+        error = False
+        request = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            response = await self.dispatch(request)
+        except ValueError as e:
+            error = True
+            response = {"error": str(e)}
+        except KeyError as e:
+            error = True
+            response = {"error": f"missing field: {e.args[0]}"}
+        finally:
+            self.stats.finish(started, error=error)
+        # Echo the id on errors too, so that clients can tell which of
+        # their requests failed
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def dispatch(self, request):
+        op = request.get("op")
+        if op == "stats":
+            stats = self.stats.snapshot()
+            stats["neighbor_cache"] = degrees.neighbor_cache.stats()
+            return stats
+        if op == "resolve":
+            return {"people": resolve_name(field(request, "name", str))}
+        if op == "search":
+            limit = field(request, "limit", int, 10)
+            if limit < 0:
+                raise ValueError("limit must not be negative")
+            return {"matches": search_names(
+                field(request, "query", str),
+                field(request, "mode", str, "fuzzy"), limit
+            )}
+        if op == "path":
+            source_name = field(request, "source", str)
+            target_name = field(request, "target", str)
+            source = degrees.resolve_person(source_name)
+            target = degrees.resolve_person(target_name)
+            if source is None or target is None:
+                missing = source_name if source is None else target_name
+                raise ValueError(f"person not found: {missing}")
+
+            # Searches are run off the event loop so slow ones do not
+            # hold up name lookups and stats
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(
+                self.executor, degrees.shortest_path,
+                source, target, self.bidirectional
+            )
+            return {
+                "source": source,
+                "target": target,
+                "degrees": None if path is None else len(path),
+                "path": None if path is None else [list(step) for step in path]
+            }
+        raise ValueError(f"unknown op: {op}")
+
+
+def field(request, name, kind, default=None):
+    """
+    Return field `name` of `request`, or `default` if it is missing and a
+    default is given. Raise KeyError if it is missing otherwise, and
+    ValueError if it is not of type `kind`.
+    """
+    if name not in request:
+        if default is None:
+            raise KeyError(name)
+        return default
+    value = request[name]
+    # bool is a subclass of int, but true is not a valid limit
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ValueError(f"field {name} must be {TYPE_NAMES[kind]}")
+    return value
+
+
+def resolve_name(name):
+    """
+    Return every person matching `name` as a list of dictionaries.
+    """
+    return [
+        {"id": person_id,
+         "name": degrees.people[person_id]["name"],
+         "birth": degrees.people[person_id]["birth"]}
+        for person_id in sorted(degrees.names.get(name.lower(), set()))
+    ]
+
+
+def search_names(query, mode, limit):
+    """
+    Return up to `limit` names matching `query` as a list of dictionaries,
+    each with a score when `mode` is "fuzzy".
+    """
+    index = degrees.name_index()
+    if mode == "prefix":
+        matches = [(name, None) for name in index.prefix(query, limit)]
+    elif mode == "fuzzy":
+        matches = index.search(query, limit)
+    else:
+        raise ValueError(f"unknown search mode: {mode}")
+    return [
+        {"name": display, "score": score, "people": resolve_name(name)}
+        for (name, score), display in zip(
+            matches, degrees.people_names([name for name, _ in matches])
+        )
+    ]
+
+
+async def serve(server, host, port, socket_path):
+    if socket_path:
+        listener = await asyncio.start_unix_server(
+            server.handle_client, path=socket_path
+        )
+        print(f"Serving on {socket_path}", file=sys.stderr)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+        print(f"Serving on {host}:{port}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve degrees of separation lookups over JSON lines."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--socket", help="listen on a Unix socket instead")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads answering path requests")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", action="store_true",
+                        help="store co-star links in a compact graph")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="do not read or write the binary snapshot")
+    parser.add_argument("--neighbor-cache", type=int, metavar="N",
+                        default=degrees.NEIGHBOR_CACHE_SIZE,
+                        help="neighbor sets to keep cached (0 disables)")
+    args = parser.parse_args()
+    degrees.neighbor_cache.resize(args.neighbor_cache)
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact, cache=args.cache)
+    degrees.name_index()
+    print("Data loaded.", file=sys.stderr)
+
+    server = DegreesServer(workers=args.workers, bidirectional=args.bidirectional)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import gc
+import os
+import pickle
+
+# Bump whenever the layout of the snapshot contents changes
+SNAPSHOT_VERSION = 1
+
+# CSV files whose modification time and size invalidate a snapshot
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def snapshot_path(directory, kind):
+    """
+    Return the path of the snapshot file of type `kind` for `directory`.
+    """
+    return os.path.join(directory, f".degrees-{kind}.snapshot")
+
+
+def source_signature(directory):
+    """
+    Return the (filename, mtime, size) of each CSV file in `directory`.
+    """
+    signature = []
+    for filename in SOURCE_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return signature
+
+
+def read_snapshot(directory, kind):
+    """
+    Return the data stored in the snapshot of type `kind` for `directory`,
+    or None if there is no snapshot or it is stale, from another version,
+    or unreadable.
+    """
+    # Unpickling creates millions of containers, each of which would count
+    # towards triggering the cyclic garbage collector; none of them can be
+    # garbage yet, so collecting during the load only wastes time
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(snapshot_path(directory, kind), "rb") as f:
+            version, signature, data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return None
+    finally:
+        if enabled:
+            gc.enable()
+
+    if version != SNAPSHOT_VERSION or signature != source_signature(directory):
+        return None
+    return data
+
+
+def write_snapshot(directory, kind, data, signature):
+    """
+    Write `data` as the snapshot of type `kind` for `directory`, read from
+    CSV files with the given `source_signature`. Take the signature before
+    reading the files, so that data from files changed while they were
+    being read is never trusted as current.
+
+    The file is written to a temporary name and moved into place so that
+    readers never see a partial snapshot. Returns False if the directory
+    is not writable.
+    """
+    path = snapshot_path(directory, kind)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            pickle.dump(
+                (SNAPSHOT_VERSION, signature, data),
+                f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return False
+    return True
@@ -1,3 +1,7 @@
+from collections import OrderedDict, deque
+from threading import Lock
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +40,112 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a count of the states it holds
+    so that `contains_state`, `add` and `remove` all run in O(1).
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self._pop()
+            # Forget the state once no other node in the frontier holds it
+            count = self.states[node.state] - 1
+            if count == 0:
+                del self.states[node.state]
+            else:
+                self.states[node.state] = count
+            return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
+
+
+class LRUCache():
+    """
+    Mapping of at most `capacity` entries that evicts the least recently
+    used entry when full, and counts hits, misses and evictions.
+    A capacity of 0 disables caching.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, compute):
+        """
+        Return the value cached for `key`, calling `compute(key)` and
+        caching its result on a miss.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        value = compute(key)
+        if self.capacity <= 0:
+            return value
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def resize(self, capacity):
+        with self.lock:
+            self.capacity = capacity
+            while len(self.entries) > max(capacity, 0):
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Return the cache's size and counters as a dictionary.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
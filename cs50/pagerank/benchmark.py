@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import instrument
+import pagerank
+from chains import parallel_sample_pagerank
+from crawler import parallel_crawl
+from incremental import incremental_pagerank
+from linkgraph import LinkGraph
+from matrix import matrix_pagerank, surfer_pagerank, top_pagerank
+from transitions import TransitionCache
+
+
+def generate_corpus(directory, n_pages, mean_links=8, alpha=2.5, dangling=0.05,
+                    seed=0):
+    """
+    Write `n_pages` synthetic HTML pages to `directory`.
+
+    Out-degrees follow a power law with exponent `alpha` scaled to average
+    about `mean_links`, except for a `dangling` fraction of pages with no
+    links, and link targets are picked by preferential attachment, so a
+    few pages collect most of the links as on the web.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    scale = mean_links * (alpha - 2) / (alpha - 1)
+
+    # Every link target is remembered so that pages are linked to again
+    # in proportion to how many links they already have
+    linked = []
+    for page in range(n_pages):
+        if rng.random() < dangling:
+            degree = 0
+        else:
+            degree = min(n_pages - 1, int(scale * rng.paretovariate(alpha - 1)))
+        links = set()
+        while len(links) < degree:
+            if linked and rng.random() < 0.5:
+                target = rng.choice(linked)
+            else:
+                target = rng.randrange(n_pages)
+            if target != page:
+                links.add(target)
+        linked.extend(links)
+
+        with open(os.path.join(directory, f"{page}.html"), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head><title>{page}</title></head>\n"
+                    f"<body>\n<h1>Page {page}</h1>\n")
+            for target in sorted(links):
+                f.write(f'<p><a href="{target}.html">Page {target}</a></p>\n')
+            f.write("</body>\n</html>\n")
+
+
+def measure(function, *args, **kwargs):
+    """
+    Return (result, report) for calling `function` with instrumentation
+    enabled, where the report has the time taken and any counters.
+    """
+    instruments = instrument.enable()
+    started = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - started
+        instrument.disable()
+    report = {"seconds": round(seconds, 6)}
+    for name, value in instruments.counters.items():
+        counter = name.partition(".")[2]
+        report[counter] = value
+        if seconds:
+            report[f"{counter}_per_sec"] = round(value / seconds)
+    return result, report
+
+
+def max_error(ranks, reference):
+    return max(abs(ranks[page] - reference[page]) for page in reference)
+
+
+def run(directory, samples, baseline_samples, top, workers, seed=0):
+    """
+    Benchmark crawling, sampling and iteration against the corpus in
+    `directory` and return the results as a dictionary.
+
+    `sample_pagerank` builds a transition model over every page at every
+    step, so it only takes `baseline_samples` samples.
+    """
+    results = {}
+
+    corpus, results["crawl"] = measure(pagerank.crawl, directory)
+    _, results["parallel_crawl_threads"] = measure(
+        parallel_crawl, directory, workers=workers
+    )
+    _, results["parallel_crawl_processes"] = measure(
+        parallel_crawl, directory, workers=workers, processes=True
+    )
+    graph = LinkGraph.from_corpus(corpus)
+    reference = matrix_pagerank(graph, pagerank.DAMPING, threshold=1e-12,
+                                norm="l1")
+
+    sampling = {}
+    for name, function, args, kwargs in [
+        ("sample_pagerank", pagerank.sample_pagerank,
+         (corpus, pagerank.DAMPING, baseline_samples), {}),
+        ("sample_pagerank_cached", pagerank.sample_pagerank,
+         (corpus, pagerank.DAMPING, samples), {"cache": TransitionCache()}),
+        ("fast_sample_pagerank", pagerank.fast_sample_pagerank,
+         (graph, pagerank.DAMPING, samples), {"seed": seed}),
+        ("surfer_pagerank", surfer_pagerank,
+         (graph, pagerank.DAMPING, 1000, max(1, samples // 1000)),
+         {"seed": seed}),
+        ("parallel_sample_pagerank", parallel_sample_pagerank,
+         (graph, pagerank.DAMPING, samples),
+         {"workers": workers, "seed": seed})
+    ]:
+        if name == "sample_pagerank" and not baseline_samples:
+            continue
+        ranks, report = measure(function, *args, **kwargs)
+        if isinstance(ranks, tuple):
+            ranks = ranks[0]
+        report["max_error"] = max_error(ranks, reference)
+        sampling[name] = report
+    results["sampling"] = sampling
+
+    iteration = {}
+    for name, function, args, kwargs in [
+        ("iterate_pagerank", pagerank.iterate_pagerank,
+         (corpus, pagerank.DAMPING), {}),
+        ("iterate_pagerank_gauss_seidel", pagerank.iterate_pagerank,
+         (corpus, pagerank.DAMPING), {"method": "gauss-seidel"}),
+        ("matrix_pagerank", matrix_pagerank,
+         (graph, pagerank.DAMPING), {})
+    ]:
+        ranks, report = measure(function, *args, **kwargs)
+        report["max_error"] = max_error(ranks, reference)
+        iteration[name] = report
+
+    top_ranks, report = measure(top_pagerank, graph, pagerank.DAMPING, top)
+    expected = sorted(reference, key=reference.get, reverse=True)[:top]
+    report["k"] = top
+    report["order_matches"] = [page for page, _ in top_ranks] == expected
+    iteration["top_pagerank"] = report
+
+    with tempfile.TemporaryDirectory() as temporary:
+        state = os.path.join(temporary, "state")
+        (ranks, _, _), report = measure(incremental_pagerank, directory,
+                                        pagerank.DAMPING, state)
+        report["max_error"] = max_error(ranks, reference)
+        iteration["incremental_pagerank"] = report
+        _, iteration["incremental_pagerank_unchanged"] = measure(
+            incremental_pagerank, directory, pagerank.DAMPING, state
+        )
+    results["iteration"] = iteration
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark PageRank engines on a synthetic corpus."
+    )
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--mean-links", type=float, default=8,
+                        help="average number of links per page")
+    parser.add_argument("--alpha", type=float, default=2.5,
+                        help="power-law exponent of out-degrees")
+    parser.add_argument("--dangling", type=float, default=0.05,
+                        help="fraction of pages without links")
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--baseline-samples", type=int, default=1000,
+                        help="samples to take with the original sample_pagerank")
+    parser.add_argument("--top", type=int, default=100,
+                        help="pages to ask top_pagerank for")
+    parser.add_argument("--workers", type=int,
+                        help="workers for parallel crawling and sampling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", metavar="DIRECTORY",
+                        help="keep the generated pages in DIRECTORY")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the JSON report to FILE instead of stdout")
+    args = parser.parse_args()
+    if args.alpha <= 2:
+        parser.error("--alpha must be greater than 2")
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.data or temporary
+        print("Generating corpus...", file=sys.stderr)
+        generate_corpus(directory, args.pages, mean_links=args.mean_links,
+                        alpha=args.alpha, dangling=args.dangling,
+                        seed=args.seed)
+        print("Running benchmarks...", file=sys.stderr)
+        results = run(directory, args.samples, args.baseline_samples,
+                      args.top, args.workers, seed=args.seed)
+
+    report = {
+        "parameters": {
+            "pages": args.pages,
+            "mean_links": args.mean_links,
+            "alpha": args.alpha,
+            "dangling": args.dangling,
+            "samples": args.samples,
+            "baseline_samples": args.baseline_samples,
+            "top": args.top,
+            "workers": args.workers,
+            "seed": args.seed
+        },
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss": instrument.peak_rss(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import multiprocessing
+import random
+import time
+
+import instrument
+from linkgraph import as_link_graph
+from pagerank import link_lists, sample_counts
+
+# Links of the graph being sampled, set in each worker by `_init_worker`
+_links = None
+
+
+def _init_worker(links):
+    global _links
+    _links = links
+
+
+def _run_chain(task):
+    damping_factor, n, seed = task
+    return sample_counts(_links, damping_factor, n, random.Random(seed),
+                         segments=2)
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, chains=4,
+                             workers=None, seed=None, progress=None):
+    """
+    Estimate PageRank by sampling `n` pages in total, split between
+    `chains` independently seeded random surfers run on a pool of
+    `workers` processes, and merge their visit counts.
+
+    Return (ranks, chain_ranks, r_hat): dictionaries mapping each page
+    of `corpus` (a corpus dictionary or `LinkGraph`) to its combined
+    estimate, to a list of each chain's estimate, and to its split R-hat.
+    R-hat compares the spread between the halves of every chain with the
+    spread within them; values near 1 suggest the chains have converged.
+
+    Samples per second are printed to `progress` if given.
+    """
+    graph = as_link_graph(corpus)
+    links = link_lists(graph)
+    seeds = random.Random(seed)
+    steps = max(4, n // chains)
+    tasks = [(damping_factor, steps, seeds.getrandbits(64))
+             for _ in range(chains)]
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(links,)) as pool:
+        halves = pool.map(_run_chain, tasks)
+    elapsed = time.perf_counter() - started
+    instrument.count("sampling.samples", steps * chains)
+    if progress is not None:
+        rate = steps * chains / elapsed if elapsed else 0
+        print(f"Sampled {steps * chains} pages in {chains} chains, "
+              f"{rate:,.0f} samples/sec", file=progress)
+
+    ranks = {}
+    chain_ranks = {}
+    r_hat = {}
+    lengths = [steps // 2, steps - steps // 2]
+    for i, page in enumerate(graph.pages):
+        estimates = [(first[i] + second[i]) / steps for first, second in halves]
+        ranks[page] = sum(estimates) / chains
+        chain_ranks[page] = estimates
+        r_hat[page] = split_r_hat([
+            (half[i], length)
+            for chain in halves
+            for half, length in zip(chain, lengths)
+        ])
+    return ranks, chain_ranks, r_hat
+
+
+def split_r_hat(visits):
+    """
+    Return the Gelman-Rubin potential scale reduction for one page from
+    `visits`, a list of (visits, length) pairs for each half chain,
+    treating each step as a 0 or 1 indicator of being on the page.
+    """
+    m = len(visits)
+    n = min(length for _, length in visits)
+    means = [count / length for count, length in visits]
+    overall = sum(means) / m
+    within = sum(p * (1 - p) * n / (n - 1) for p in means) / m
+    if within == 0:
+        return 1.0
+    between = n * sum((p - overall) ** 2 for p in means) / (m - 1)
+    pooled = (n - 1) / n * within + between / n
+    return (pooled / within) ** 0.5
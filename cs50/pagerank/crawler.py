@@ -0,0 +1,128 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import instrument
+
+# Same pattern as `crawl`
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes of text read from a file at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def extract_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of links in the HTML file at `path`, reading it a chunk
+    at a time instead of all at once.
+
+    A link tag may be split between two chunks, so text from a "<a" that
+    could still become a match is carried over to the next chunk. Any
+    other tag starting with "<a", such as "<article>", is not.
+    """
+    links = set()
+    carry = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            text = carry + chunk
+            end = 0
+            for match in LINK_PATTERN.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            if not chunk:
+                return links
+
+            # Keep a possibly incomplete link tag, or a trailing "<" that
+            # may start one, for the next chunk
+            start = _incomplete_link(text, end)
+            if start == -1:
+                start = max(end, len(text) - 1)
+            carry = text[start:]
+
+
+def _incomplete_link(text, start):
+    """
+    Return the position of the first "<a" at or after `start` in `text`
+    that the rest of `text` could still extend into a match of
+    `LINK_PATTERN`, or -1 if there is none.
+
+    That is a "<a" at the very end, or followed by whitespace and either
+    no ">" yet, or an `href="` before the ">" whose value is unterminated.
+    """
+    while True:
+        start = text.find("<a", start)
+        if start == -1:
+            return -1
+        after = start + 2
+        if after == len(text):
+            return start
+        if text[after].isspace():
+            close = text.find(">", after)
+            if close == -1:
+                return start
+            href = text.find('href="', after, close)
+            if href != -1 and text.find('"', href + 6) == -1:
+                return start
+        start = after
+
+
+def _crawl_file(task):
+    directory, filename, chunk_size = task
+    path = os.path.join(directory, filename)
+    return filename, extract_links(path, chunk_size), os.path.getsize(path)
+
+
+def parallel_crawl(directory, workers=None, processes=False,
+                   chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Return the same corpus dictionary as `crawl(directory)`, parsing
+    files concurrently across a pool of `workers` threads, or processes
+    if `processes` is True, and streaming each file in chunks.
+
+    Files per second and bytes parsed are printed to `progress` if given.
+    """
+    filenames = [
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    ]
+    tasks = [(directory, filename, chunk_size) for filename in filenames]
+
+    pages = dict()
+    parsed = 0
+    started = time.perf_counter()
+    if processes:
+        executor = ProcessPoolExecutor(workers)
+        chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+    else:
+        executor = ThreadPoolExecutor(workers)
+        chunksize = 1
+    with executor:
+        for filename, links, size in executor.map(
+            _crawl_file, tasks, chunksize=chunksize
+        ):
+            pages[filename] = links - {filename}
+            parsed += size
+            if progress is not None and len(pages) % 10000 == 0:
+                report_progress(progress, len(pages), parsed, started)
+    if progress is not None:
+        report_progress(progress, len(pages), parsed, started)
+    instrument.count("crawl.files", len(pages))
+    instrument.count("crawl.bytes", parsed)
+
+    # Only include links to other pages in the corpus
+    for filename in pages:
+        pages[filename] = set(
+            link for link in pages[filename]
+            if link in pages
+        )
+
+    return pages
+
+
+def report_progress(out, files, parsed, started):
+    elapsed = time.perf_counter() - started
+    rate = files / elapsed if elapsed else 0
+    print(f"Crawled {files} files ({parsed / 1e6:.1f} MB), "
+          f"{rate:,.0f} files/sec", file=out)
@@ -0,0 +1,191 @@
+import os
+import pickle
+from collections import deque
+
+import instrument
+from crawler import extract_links
+
+# Bump whenever the layout of the saved state changes
+STATE_VERSION = 1
+
+
+def scan_corpus(directory, previous_files):
+    """
+    Return (files, corpus) for the HTML files in `directory`, where
+    `files` maps each filename to its (mtime, size, links) and `corpus`
+    is the same dictionary `crawl` would return.
+
+    Files whose mtime and size match `previous_files` are not re-parsed.
+    """
+    files = {}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html"):
+            continue
+        stat = entry.stat()
+        previous = previous_files.get(entry.name)
+        if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+            files[entry.name] = previous
+        else:
+            links = extract_links(entry.path) - {entry.name}
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size, links)
+            instrument.count("crawl.files")
+            instrument.count("crawl.bytes", stat.st_size)
+
+    # Only include links to other pages in the corpus
+    corpus = {
+        filename: set(link for link in links if link in files)
+        for filename, (_, _, links) in files.items()
+    }
+    return files, corpus
+
+
+def push_pagerank(corpus, damping_factor, scores, residual, tolerance):
+    """
+    Bring `scores` to within `tolerance` of the solution of
+
+        score(p) = 1 + damping_factor * sum(score(q) / len(corpus[q])
+                                            for each q linking to p)
+
+    by repeatedly pushing any page's residual larger than `tolerance` into
+    its score and on to the pages it links to. Both dictionaries are
+    updated in place, and work is only done where residual remains.
+
+    Teleporting and pages without links both spread rank uniformly, so
+    PageRank is these scores divided by their sum.
+
+    Return the number of pushes made.
+    """
+    queue = deque(p for p in corpus if abs(residual[p]) > tolerance)
+    queued = set(queue)
+    pushes = 0
+
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        amount = residual[page]
+        residual[page] = 0.0
+        scores[page] += amount
+        pushes += 1
+
+        links = corpus[page]
+        if not links:
+            continue
+        share = damping_factor * amount / len(links)
+        for link in links:
+            residual[link] += share
+            if link not in queued and abs(residual[link]) > tolerance:
+                queue.append(link)
+                queued.add(link)
+
+    return pushes
+
+
+def apply_changes(old_corpus, corpus, damping_factor, scores, residual):
+    """
+    Update `scores` and `residual` in place so that they describe the
+    previous solution against the links of `corpus` instead of
+    `old_corpus`.
+
+    Return (added, removed, modified) sets of pages.
+    """
+    added = set(corpus) - set(old_corpus)
+    removed = set(old_corpus) - set(corpus)
+    modified = {
+        p for p in corpus
+        if p in old_corpus and corpus[p] != old_corpus[p]
+    }
+
+    # Withdraw what removed and modified pages used to pass along their
+    # old links, then pass it along their new links
+    for page in removed | modified:
+        links = old_corpus[page]
+        if links:
+            share = damping_factor * scores[page] / len(links)
+            for link in links:
+                if link in corpus:
+                    residual[link] -= share
+    for page in added:
+        scores[page] = 0.0
+        residual[page] = 1.0
+    for page in modified:
+        links = corpus[page]
+        if links:
+            share = damping_factor * scores[page] / len(links)
+            for link in links:
+                residual[link] += share
+
+    for page in removed:
+        del scores[page]
+        del residual[page]
+
+    return added, removed, modified
+
+
+def load_state(path):
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(path, state):
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def incremental_pagerank(directory, damping_factor, state_path,
+                         tolerance=1e-9):
+    """
+    Return (ranks, changes, corpus) for the corpus in `directory`, reusing
+    the link graph and scores saved at `state_path` by the previous run.
+
+    Only changed files are re-parsed, and only pages near added, removed
+    or modified pages need to re-converge, until no page has more than
+    `tolerance` of rank left to push. `ranks` is a dictionary like
+    `iterate_pagerank` returns, `changes` counts the pages added, removed
+    and modified and the pushes needed, and `corpus` is the dictionary
+    `crawl` would return.
+    """
+    state = load_state(state_path)
+    if state is None or state["damping"] != damping_factor \
+            or state["directory"] != os.path.abspath(directory):
+        state = {
+            "version": STATE_VERSION,
+            "directory": os.path.abspath(directory),
+            "damping": damping_factor,
+            "files": {},
+            "corpus": {},
+            "scores": {},
+            "residual": {}
+        }
+
+    files, corpus = scan_corpus(directory, state["files"])
+    scores, residual = state["scores"], state["residual"]
+    added, removed, modified = apply_changes(
+        state["corpus"], corpus, damping_factor, scores, residual
+    )
+    # Every score ends up at least 1, so ranks are scores divided by at
+    # least the number of pages
+    pushes = push_pagerank(corpus, damping_factor, scores, residual,
+                           tolerance * len(corpus))
+    instrument.count("iteration.pushes", pushes)
+
+    state["files"] = files
+    state["corpus"] = corpus
+    save_state(state_path, state)
+
+    total = sum(scores.values())
+    ranks = {p: scores[p] / total for p in scores}
+    changes = {
+        "added": len(added),
+        "removed": len(removed),
+        "modified": len(modified),
+        "pushes": pushes
+    }
+    return ranks, changes, corpus
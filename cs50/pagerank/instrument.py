@@ -0,0 +1,97 @@
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Collecting `Instruments`, or None when instrumentation is off
+_active = None
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process in bytes,
+    or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Instruments():
+    """
+    Counters and phase timings collected while instrumentation is enabled.
+
+    Counters are named "phase.counter", so that a counter of a timed phase
+    is also reported per second of that phase, e.g. "sampling.samples"
+    over the "sampling" phase as "sampling.samples_per_sec".
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.seconds = {}
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.seconds[phase] = self.seconds.get(phase, 0) + elapsed
+
+    def summary(self):
+        rates = {}
+        for name, value in self.counters.items():
+            phase, _, counter = name.partition(".")
+            if self.seconds.get(phase):
+                rates[f"{name}_per_sec"] = round(value / self.seconds[phase])
+        return {
+            "counters": dict(self.counters),
+            "seconds": {
+                phase: round(seconds, 6)
+                for phase, seconds in self.seconds.items()
+            },
+            "rates": rates,
+            "peak_rss": peak_rss()
+        }
+
+
+def enable():
+    """
+    Start collecting into fresh `Instruments`, and return them.
+    """
+    global _active
+    _active = Instruments()
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def count(name, n=1):
+    """
+    Add `n` to counter `name` if instrumentation is enabled.
+    """
+    if _active is not None:
+        _active.count(name, n)
+
+
+def timer(phase):
+    """
+    Return a context manager that adds the time spent in it to `phase`
+    if instrumentation is enabled.
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.timer(phase)
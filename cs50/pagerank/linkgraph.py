@@ -0,0 +1,158 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# File layout: header, then page offsets, link targets, name offsets
+# (all little-endian int64) and the UTF-8 page names back to back
+MAGIC = b"PRLG"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQQ")
+
+
+class PageNames():
+    """
+    Read-only sequence of page names decoded on demand from a UTF-8 string
+    table, so that loading a graph does not create every string up front.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("page index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus with pages mapped to dense integers and
+    out-links stored as arrays in compressed sparse row form.
+
+    The pages linked to by page `i` are
+    `targets[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        Dictionary mapping each page name to its index, built on first use.
+        """
+        if self._index is None:
+            self._index = {page: i for i, page in enumerate(self.pages)}
+        return self._index
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a link graph from a corpus dictionary as returned by `crawl`.
+        Pages are numbered in sorted order.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = array("l", [0])
+        targets = array("l")
+        for page in pages:
+            targets.extend(sorted(index[link] for link in corpus[page]))
+            offsets.append(len(targets))
+        graph = cls(pages, offsets, targets)
+        graph._index = index
+        return graph
+
+    def save(self, path):
+        """
+        Write the graph to `path` in a binary format that `load` can map
+        into memory without parsing.
+        """
+        blob = bytearray()
+        name_offsets = array("q", [0])
+        for page in self.pages:
+            blob += page.encode("utf-8")
+            name_offsets.append(len(blob))
+
+        sections = [array("q", self.offsets), array("q", self.targets),
+                    name_offsets]
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self), len(self.targets),
+                                len(blob)))
+            for section in sections:
+                if sys.byteorder == "big":
+                    section.byteswap()
+                f.write(section.tobytes())
+            f.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the graph saved at `path` by `save`, with its arrays and
+        page names read straight from a memory map of the file.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_pages, n_links, n_bytes = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} link graph")
+
+        view = memoryview(buffer)
+        position = HEADER.size
+
+        def section(count):
+            nonlocal position
+            start, position = position, position + 8 * count
+            if sys.byteorder == "big":
+                copy = array("q")
+                copy.frombytes(view[start:position])
+                copy.byteswap()
+                return copy
+            return view[start:position].cast("q")
+
+        offsets = section(n_pages + 1)
+        targets = section(n_links)
+        name_offsets = section(n_pages + 1)
+        blob = view[position:position + n_bytes]
+        return cls(PageNames(name_offsets, blob), offsets, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, i):
+        """
+        Return the page indices linked to by page index `i`.
+        """
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def out_degree(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def to_corpus(self):
+        """
+        Return the graph as a corpus dictionary in the format of `crawl`.
+        """
+        return {
+            page: {self.pages[j] for j in self.links(i)}
+            for i, page in enumerate(self.pages)
+        }
+
+
+def as_link_graph(corpus):
+    """
+    Return `corpus` as a `LinkGraph`, converting it if it is a corpus
+    dictionary as returned by `crawl`.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
@@ -0,0 +1,249 @@
+import numpy as np
+
+import instrument
+from linkgraph import as_link_graph
+
+
+class LinkMatrix():
+    """
+    Column-normalised link matrix of a corpus, held as NumPy arrays, for
+    computing PageRank as repeated sparse matrix-vector products.
+
+    Each link i -> j is stored once, as `sources[k] = i` and
+    `destinations[k] = j` with `weights[k] = 1 / out_degree(i)`. Pages
+    with no links are treated as linking to every page, as in
+    `iterate_pagerank`, without storing those N links.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.n_pages = len(graph)
+        offsets = np.asarray(graph.offsets, dtype=np.int64)
+        out_degree = np.diff(offsets)
+
+        self.sources = np.repeat(np.arange(self.n_pages), out_degree)
+        self.destinations = np.asarray(graph.targets, dtype=np.int64)
+        self.weights = 1.0 / out_degree[self.sources]
+        self.dangling = out_degree == 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        return cls(as_link_graph(corpus))
+
+    def multiply(self, ranks):
+        """
+        Return the rank each page receives through links (including the
+        implicit links of dangling pages) given current `ranks`.
+        """
+        received = np.bincount(
+            self.destinations,
+            weights=ranks[self.sources] * self.weights,
+            minlength=self.n_pages
+        )
+        received += ranks[self.dangling].sum() / self.n_pages
+        return received
+
+    def teleport_vector(self, teleport):
+        """
+        Return a NumPy teleport distribution for `teleport`, either an
+        iterable of page names to jump to uniformly, or a dictionary
+        mapping page names to weights.
+        """
+        vector = np.zeros(self.n_pages)
+        index = self.graph.index
+        if isinstance(teleport, dict):
+            for page, weight in teleport.items():
+                vector[index[page]] += weight
+        else:
+            for page in teleport:
+                vector[index[page]] = 1
+        total = vector.sum()
+        if total <= 0:
+            raise ValueError("teleport set must have positive weight")
+        return vector / total
+
+    def personalized(self, damping_factor, teleport, threshold=1e-8,
+                     max_iterations=1000):
+        """
+        Return a NumPy array of personalized PageRank values, where random
+        jumps land according to the `teleport` distribution (a NumPy array
+        summing to 1) instead of uniformly.
+
+        Pages without links still spread their rank uniformly, which
+        keeps the result linear in `teleport`: the ranks for a mixture of
+        teleport distributions are the same mixture of their ranks.
+        """
+        ranks = teleport.copy()
+        for _ in range(max_iterations):
+            updated = ((1 - damping_factor) * teleport
+                       + damping_factor * self.multiply(ranks))
+            residual = np.abs(updated - ranks).sum()
+            ranks = updated
+            if residual < threshold:
+                break
+        return ranks
+
+    def pagerank(self, damping_factor, threshold=0.001, max_iterations=1000,
+                 norm="inf", callback=None):
+        """
+        Return a NumPy array of PageRank values, found by power iteration
+        from a uniform start until the change between iterations is below
+        `threshold`, or `max_iterations` have run.
+
+        The change is measured by the "inf" (largest change of any page)
+        or "l1" (sum of changes) `norm`, and `callback(iteration, residual)`
+        is called after every iteration.
+        """
+        if norm not in ("inf", "l1"):
+            raise ValueError(f"unknown norm: {norm}")
+
+        n = self.n_pages
+        ranks = np.full(n, 1 / n)
+        for iteration in range(1, max_iterations + 1):
+            updated = (1 - damping_factor) / n + damping_factor * self.multiply(ranks)
+            change = np.abs(updated - ranks)
+            residual = change.max() if norm == "inf" else change.sum()
+            ranks = updated
+            if callback is not None:
+                callback(iteration, float(residual))
+            if residual < threshold:
+                break
+        instrument.count("iteration.iterations", iteration)
+        return ranks
+
+
+def matrix_pagerank(corpus, damping_factor, threshold=0.001, max_iterations=1000,
+                    norm="inf", callback=None):
+    """
+    Return PageRank values for each page of `corpus` (a corpus dictionary
+    or `LinkGraph`) computed with sparse matrix-vector products, as a
+    dictionary like `iterate_pagerank`.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks = matrix.pagerank(damping_factor, threshold, max_iterations,
+                            norm=norm, callback=callback)
+    return dict(zip(matrix.graph.pages, ranks.tolist()))
+
+
+def top_pagerank(corpus, damping_factor, k, max_iterations=1000,
+                 threshold=1e-12, callback=None):
+    """
+    Return a list of (page, rank) pairs for the `k` pages of `corpus` (a
+    corpus dictionary or `LinkGraph`) with the highest PageRank, highest
+    first, without building a dictionary of every page.
+
+    Power iteration stops as soon as the order of those pages can no
+    longer change. After an iteration that changed the ranks by `delta`
+    in total (L1 norm), the total error left is at most
+    `damping_factor / (1 - damping_factor) * delta`, so no two ranks that
+    differ by more than that can swap. Iteration also stops once the
+    error bound falls below `threshold`, in case of exact ties.
+    `callback(iteration, bound)` is called after every iteration.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    n = matrix.n_pages
+    k = min(k, n)
+    if k == 0:
+        return []
+
+    ranks = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        updated = (1 - damping_factor) / n + damping_factor * matrix.multiply(ranks)
+        bound = damping_factor / (1 - damping_factor) * np.abs(updated - ranks).sum()
+        ranks = updated
+        if callback is not None:
+            callback(iteration, float(bound))
+
+        # The top k, plus the next page to check none of them can drop out
+        candidates = np.argpartition(-ranks, min(k, n - 1))[:k + 1]
+        top = candidates[np.argsort(-ranks[candidates])]
+        if bound < threshold or (np.diff(ranks[top]) < -bound).all():
+            break
+
+    instrument.count("iteration.iterations", iteration)
+    pages = matrix.graph.pages
+    return [(pages[i], float(ranks[i])) for i in top[:k]]
+
+
+def personalized_pagerank(corpus, damping_factor, teleport, threshold=1e-8,
+                          max_iterations=1000):
+    """
+    Return personalized PageRank values for each page of `corpus` as a
+    dictionary, with random jumps landing on the pages in `teleport` (an
+    iterable of pages, or a dictionary of page weights).
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks = matrix.personalized(
+        damping_factor, matrix.teleport_vector(teleport),
+        threshold, max_iterations
+    )
+    return dict(zip(matrix.graph.pages, ranks.tolist()))
+
+
+def simulate_surfers(graph, damping_factor, walkers, steps, batches=32, seed=None):
+    """
+    Simulate `walkers` independent random surfers on `graph` for `steps`
+    steps each, all advancing together as NumPy arrays.
+
+    Walkers are split into `batches` groups whose visit frequencies give
+    independent estimates, so the spread between groups measures the
+    sampling variance. That needs at least two walkers.
+
+    Return (ranks, variance): NumPy arrays with each page's estimated
+    PageRank and the sampling variance of that estimate.
+    """
+    if walkers < 2:
+        raise ValueError("need at least two walkers to estimate variance")
+    rng = np.random.default_rng(seed)
+    n = len(graph)
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    out_degree = np.diff(offsets)
+    batches = max(2, min(batches, walkers))
+
+    # Each walker's batch, pre-scaled so batch * n + page is a flat index
+    batch_base = (np.arange(walkers) % batches) * n
+    counts = np.zeros(batches * n, dtype=np.int64)
+
+    position = rng.integers(0, n, walkers)
+    for step in range(steps):
+        # Unlike bincount, this touches only the visited counts, so a step
+        # costs O(walkers) rather than O(batches * n)
+        np.add.at(counts, batch_base + position, 1)
+        if step == steps - 1:
+            break
+
+        # Follow a link with probability `damping_factor` if there is one,
+        # otherwise jump to a page chosen uniformly at random
+        degree = out_degree[position]
+        follow = (rng.random(walkers) < damping_factor) & (degree > 0)
+        jump = rng.integers(0, n, walkers)
+        if len(targets):
+            choice = (rng.random(walkers) * degree).astype(np.int64)
+            # Walkers that will not follow a link may index past the end
+            linked = targets[np.minimum(offsets[position] + choice,
+                                        len(targets) - 1)]
+            position = np.where(follow, linked, jump)
+        else:
+            position = jump
+
+    counts = counts.reshape(batches, n)
+    batch_ranks = counts / counts.sum(axis=1, keepdims=True)
+    ranks = counts.sum(axis=0) / counts.sum()
+    variance = batch_ranks.var(axis=0, ddof=1) / batches
+    return ranks, variance
+
+
+def surfer_pagerank(corpus, damping_factor, walkers, steps, seed=None):
+    """
+    Return (ranks, variance) dictionaries mapping each page of `corpus`
+    (a corpus dictionary or `LinkGraph`) to its PageRank estimated by
+    `simulate_surfers` and the sampling variance of that estimate.
+    """
+    graph = as_link_graph(corpus)
+    ranks, variance = simulate_surfers(
+        graph, damping_factor, walkers, steps, seed=seed
+    )
+    instrument.count("sampling.samples", walkers * steps)
+    return (dict(zip(graph.pages, ranks.tolist())),
+            dict(zip(graph.pages, variance.tolist())))
@@ -1,24 +1,209 @@
+import argparse
+import json
 import os
 import random
 import re
 import sys
 
+import instrument
+from linkgraph import LinkGraph, as_link_graph
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
+    parser = argparse.ArgumentParser(description="Compute PageRank for a corpus.")
+    parser.add_argument("corpus",
+                        help="directory of HTML pages, or a link graph file "
+                             "written by --save-graph")
+    parser.add_argument("--save-graph", metavar="FILE",
+                        help="write the crawled links to FILE as a compact "
+                             "link graph")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--sampler",
+                        choices=("model", "fast", "surfers", "chains"),
+                        default="model",
+                        help="sample with transition_model at every step, "
+                             "with links looked up once beforehand, with "
+                             "many NumPy surfers in lockstep, or with "
+                             "independent chains across processes")
+    parser.add_argument("--transition-cache", type=int, metavar="SIZE",
+                        help="cache transition models for --sampler model, "
+                             "holding up to SIZE links")
+    parser.add_argument("--walkers", type=int, default=1000,
+                        help="surfers for --sampler surfers, which each take "
+                             "samples / walkers steps")
+    parser.add_argument("--chains", type=int, default=4,
+                        help="chains for --sampler chains, which each take "
+                             "samples / chains steps")
+    parser.add_argument("--sample-workers", type=int,
+                        help="processes for --sampler chains (default: one "
+                             "per CPU)")
+    parser.add_argument("--engine", choices=("python", "matrix"), default="python",
+                        help="iterate in pure Python or with sparse NumPy "
+                             "matrix-vector products")
+    parser.add_argument("--crawl-workers", type=int, default=0,
+                        help="parse files concurrently across this many workers")
+    parser.add_argument("--crawl-processes", action="store_true",
+                        help="use processes rather than threads for crawling")
+    parser.add_argument("--incremental", metavar="STATE",
+                        help="reuse the links and ranks saved in STATE by the "
+                             "last run, re-converging only around changed pages")
+    parser.add_argument("--tolerance", type=float, default=0.001,
+                        help="stop iterating once ranks change by less than this")
+    parser.add_argument("--norm", choices=("inf", "l1"), default="inf",
+                        help="measure change by the largest change of any "
+                             "page, or the sum of changes")
+    parser.add_argument("--max-iterations", type=int,
+                        help="stop iterating after this many iterations")
+    parser.add_argument("--method", choices=("jacobi", "gauss-seidel"),
+                        default="jacobi",
+                        help="update scheme for --engine python")
+    parser.add_argument("--teleport", metavar="PAGE", nargs="+",
+                        help="also print personalized PageRank with random "
+                             "jumps landing only on these pages")
+    parser.add_argument("--top", type=int, metavar="K",
+                        help="print only the K highest ranked pages, "
+                             "iterating only until their order is settled")
+    parser.add_argument("--residuals", action="store_true",
+                        help="print the residual of every iteration to stderr")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="write timings, counters and peak memory as "
+                             "JSON to FILE, or to stderr if FILE is -")
+    args = parser.parse_args()
+    if args.sampler == "surfers" and args.walkers < 2:
+        parser.error("--walkers must be at least 2")
+    instruments = instrument.enable() if args.stats else None
+
+    # The fast engines work on a link graph directly; the original
+    # functions need a corpus dictionary
+    with instrument.timer("crawl"):
+        if os.path.isfile(args.corpus):
+            if args.incremental:
+                parser.error("--incremental needs a directory of HTML pages")
+            graph = LinkGraph.load(args.corpus)
+            corpus = None
+        else:
+            if args.incremental:
+                # Only files changed since the last run are parsed, and
+                # the saved ranks re-converged around them
+                from incremental import incremental_pagerank
+                incremental_ranks, changes, corpus = incremental_pagerank(
+                    args.corpus, DAMPING, args.incremental,
+                    tolerance=args.tolerance
+                )
+            elif args.crawl_workers:
+                from crawler import parallel_crawl
+                corpus = parallel_crawl(args.corpus, workers=args.crawl_workers,
+                                        processes=args.crawl_processes,
+                                        progress=sys.stderr)
+            else:
+                corpus = crawl(args.corpus)
+            graph = LinkGraph.from_corpus(corpus)
+            if args.save_graph:
+                graph.save(args.save_graph)
+    if corpus is None and (args.sampler == "model" or
+                           (args.engine == "python" and args.top is None)):
+        corpus = graph.to_corpus()
+
+    def callback(iteration, residual):
+        if args.residuals:
+            print(f"Iteration {iteration}: residual {residual:.3e}", file=sys.stderr)
+
+    variance = None
+    chain_ranks = None
+    with instrument.timer("sampling"):
+        if args.sampler == "chains":
+            from chains import parallel_sample_pagerank
+            ranks, chain_ranks, r_hat = parallel_sample_pagerank(
+                graph, DAMPING, args.samples, chains=args.chains,
+                workers=args.sample_workers, progress=sys.stderr
+            )
+        elif args.sampler == "surfers":
+            from matrix import surfer_pagerank
+            steps = max(1, args.samples // args.walkers)
+            ranks, variance = surfer_pagerank(graph, DAMPING, args.walkers, steps)
+        elif args.sampler == "fast":
+            ranks = fast_sample_pagerank(graph, DAMPING, args.samples)
+        elif args.transition_cache is not None:
+            from transitions import TransitionCache
+            cache = TransitionCache(args.transition_cache)
+            ranks = sample_pagerank(corpus, DAMPING, args.samples, cache=cache)
+            print(f"Transition cache: {cache.stats()}", file=sys.stderr)
+        else:
+            ranks = sample_pagerank(corpus, DAMPING, args.samples)
+    print(f"PageRank Results from Sampling (n = {args.samples})")
+    if args.top is None:
+        shown = sorted(ranks)
+    else:
+        shown = sorted(ranks, key=ranks.get, reverse=True)[:args.top]
+    for page in shown:
+        if chain_ranks is not None:
+            chain_values = " ".join(f"{value:.4f}" for value in chain_ranks[page])
+            print(f"  {page}: {ranks[page]:.4f} (chains: {chain_values}, "
+                  f"R-hat {r_hat[page]:.3f})")
+        elif variance is None:
+            print(f"  {page}: {ranks[page]:.4f}")
+        else:
+            print(f"  {page}: {ranks[page]:.4f} ± {variance[page] ** 0.5:.4f}")
+    if chain_ranks is not None:
+        print(f"Largest R-hat: {max(r_hat.values()):.3f}")
+    with instrument.timer("iteration"):
+        if args.incremental:
+            ranks = incremental_ranks
+            print(f"Pages added: {changes['added']}, "
+                  f"removed: {changes['removed']}, "
+                  f"modified: {changes['modified']}, "
+                  f"pushes: {changes['pushes']}")
+            if args.top is not None:
+                top = sorted(ranks.items(), key=lambda item: item[1],
+                             reverse=True)[:args.top]
+                ranks = None
+        elif args.top is not None:
+            from matrix import top_pagerank
+            top = top_pagerank(graph, DAMPING, args.top,
+                               max_iterations=args.max_iterations or 1000,
+                               callback=callback)
+            ranks = None
+        elif args.engine == "matrix":
+            from matrix import matrix_pagerank
+            ranks = matrix_pagerank(graph, DAMPING, threshold=args.tolerance,
+                                    norm=args.norm,
+                                    max_iterations=args.max_iterations or 1000,
+                                    callback=callback)
+        else:
+            ranks = iterate_pagerank(corpus, DAMPING, tolerance=args.tolerance,
+                                     norm=args.norm,
+                                     max_iterations=args.max_iterations,
+                                     method=args.method, callback=callback)
+    if ranks is None:
+        print(f"Top {len(top)} PageRank Results from Iteration")
+        for page, rank in top:
+            print(f"  {page}: {rank:.4f}")
+    else:
+        print(f"PageRank Results from Iteration")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    if args.teleport:
+        from matrix import personalized_pagerank
+        missing = set(args.teleport) - set(graph.index)
+        if missing:
+            sys.exit(f"Pages not in corpus: {', '.join(sorted(missing))}")
+        ranks = personalized_pagerank(graph, DAMPING, args.teleport)
+        print(f"Personalized PageRank Results ({', '.join(args.teleport)})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    if instruments is not None:
+        write_stats(args.stats, instruments.summary())
+
+
+def write_stats(path, summary):
+    if path == "-":
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
 
 
 def crawl(directory):
@@ -37,6 +222,8 @@ def crawl(directory):
             contents = f.read()
             links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
             pages[filename] = set(links) - {filename}
+            instrument.count("crawl.files")
+            instrument.count("crawl.bytes", os.fstat(f.fileno()).st_size)
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -59,6 +246,8 @@ def transition_model(corpus, page, damping_factor):
 
     """
 
+    instrument.count("sampling.transition_models")
+
     # Links avaiable given a current page
     links = corpus[page]
     n_links = len(links)
@@ -95,11 +284,14 @@ def transition_model(corpus, page, damping_factor):
     return transition_model
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, cache=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    If `cache` is a `TransitionCache`, each page's transition model is
+    computed once and sampled from its compact form.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
@@ -117,6 +309,12 @@ def sample_pagerank(corpus, damping_factor, n):
 
     for i in range(n-1):
 
+        if cache is not None:
+            transition = cache.get(corpus, page, damping_factor)
+            page = pages[transition.sample(random.random, len(pages))]
+            counts[page] += 1
+            continue
+
         # Calcuate the transition model of the current page
         distribution = transition_model(corpus, page, damping_factor)
 
@@ -131,82 +329,197 @@ def sample_pagerank(corpus, damping_factor, n):
 
     # Normalize results
     page_rank = {p: counts[p]/n for p in counts}
+    instrument.count("sampling.samples", n)
 
     return page_rank
 
 
-def iterate_pagerank(corpus, damping_factor):
+def fast_sample_pagerank(corpus, damping_factor, n, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages like
+    `sample_pagerank`, but with each page's links looked up once
+    beforehand so that every step costs O(1) instead of O(N).
+
+    The transition model is a mix of two uniform choices: with probability
+    `damping_factor` follow one of the page's links, otherwise (or if the
+    page has no links) jump to any page. So each step draws one number to
+    pick between them and one index into the chosen list.
+
+    `corpus` may also be a `LinkGraph`.
+    """
+    graph = as_link_graph(corpus)
+    counts = sample_counts(link_lists(graph), damping_factor, n,
+                           random.Random(seed))
+    instrument.count("sampling.samples", n)
+    return {p: counts[i] / n for i, p in enumerate(graph.pages)}
+
+
+def link_lists(graph):
+    """
+    Return the outgoing links of each page of `graph` as lists of page
+    indices.
+    """
+    return [graph.links(i).tolist() for i in range(len(graph))]
+
+
+def sample_counts(links, damping_factor, n, rng, segments=1):
+    """
+    Walk `n` steps of the random surfer over `links` (as returned by
+    `link_lists`) drawing from `rng`, and return how many times each page
+    was visited.
+
+    With `segments` greater than 1, return a list of visit counts for
+    each of that many consecutive stretches of the walk instead.
+    """
+    n_pages = len(links)
+    stretches = [[0] * n_pages for _ in range(segments)]
+    page = rng.randrange(n_pages)
+    stretches[0][page] += 1
+
+    uniform = rng.random
+    start = 1
+    for k, counts in enumerate(stretches):
+        end = n * (k + 1) // segments
+        for _ in range(start, end):
+            outgoing = links[page]
+            if outgoing and uniform() < damping_factor:
+                page = outgoing[int(uniform() * len(outgoing))]
+            else:
+                page = int(uniform() * n_pages)
+            counts[page] += 1
+        start = end
+
+    return stretches if segments > 1 else stretches[0]
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=0.001, norm="inf",
+                     max_iterations=None, method="jacobi", callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Iteration stops once the change between two iterations, measured with
+    the "inf" (largest change of any page) or "l1" (sum of changes) `norm`,
+    is below `tolerance`, or after `max_iterations` iterations if given.
+    `callback(iteration, residual)` is called after every iteration.
+
+    With `method="gauss-seidel"` each page's new value is used as soon as
+    it is computed within an iteration, which needs fewer iterations than
+    updating all pages together ("jacobi") to reach a tight `tolerance`:
+    at 1e-10, 14 rather than 31 on corpus0, 34 rather than 57 on corpus1,
+    21 rather than 98 on corpus2, and 14 rather than 21 on 2000- and
+    5000-page graphs from `benchmark.generate_corpus`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if norm not in ("inf", "l1"):
+        raise ValueError(f"unknown norm: {norm}")
+    if method not in ("jacobi", "gauss-seidel"):
+        raise ValueError(f"unknown method: {method}")
 
     # Extract all page names from Corpus and set n_pages variable
     pages = list(corpus.keys())
     n_pages = len(pages)
 
-    # Starting probability of 1/N
-    start_prob = 1/len(pages)
-
-    # Initative page rank dictionary with all pages and set their starting probability 1/N
-    page_rank = {p: start_prob for p in pages}
-
-    while True:  # We will continue to iterate until convergence
-
-        updated_ranks = {}  # Initatizing dictionary for updated ranks
-
-        for p in pages:  # Looping through all pages in corpus
-
-            # Calcualting their starting rank using below formula (provided by assignment instructions)
-            base_rank = (1 - damping_factor) / n_pages
-            sum = 0  # setting initial sum for calculating page rank to be modified in loop
-
-            # Using this nested loop we are finding the number of linked pages for each page in our corpus
-            for pi in pages:
-                linked_pages = corpus[pi]  # Extracting linked pages for each page (pi)
-                n_linked_pages = len(linked_pages)  # Counting the number of linked pages
+    # Pages that link to each page, with the share of their rank they give it.
+    # Pages with no links are treated as linking to every page uniformly
+    incoming = {p: [] for p in pages}
+    dangling = []
+    for pi in pages:
+        if corpus[pi]:
+            share = 1 / len(corpus[pi])
+            for p in corpus[pi]:
+                incoming[p].append((pi, share))
+        else:
+            dangling.append(pi)
+
+    if method == "gauss-seidel":
+        return _gauss_seidel_pagerank(pages, incoming, dangling, damping_factor,
+                                      tolerance, norm, max_iterations, callback)
+
+    # Starting probability of 1/N for every page
+    page_rank = {p: 1 / n_pages for p in pages}
+    base_rank = (1 - damping_factor) / n_pages
+
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        iteration += 1
+
+        # Rank spread evenly to all pages by pages without links
+        dangling_rank = sum(page_rank[pi] for pi in dangling) / n_pages
+
+        updated_ranks = {}
+        for p in pages:
+            linked_rank = sum(page_rank[pi] * share for pi, share in incoming[p])
+            updated_ranks[p] = base_rank + damping_factor * (linked_rank + dangling_rank)
 
-                if linked_pages:
-                    if p in linked_pages:  # Check if the page we're investigating is even included in our linked pages
-                        # If yes, then we add the page rank for
-                        sum = sum + (page_rank[pi] / n_linked_pages)
-                else:
-                    # If no linked pages then we treat it as if it links to every page uniformly
-                    # we use n_pages over n_linked_pages because of the above assumption
-                    sum = sum + (page_rank[pi] / n_pages)
+        residual = _norm((updated_ranks[p] - page_rank[p] for p in pages), norm)
+        page_rank = updated_ranks
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
 
-            # We loop through all of the pages and continue adding the page
-            # rank for a single particular page to all other pages
-            # before finally setting the updated rank equal to the full sum of all the pages we can infer via corpus or assume via no linked pages assumption
-            updated_ranks[p] = base_rank + damping_factor * sum
+    instrument.count("iteration.iterations", iteration)
+    return page_rank
 
-        converged = True
-        convergence_threshold = 0.001  # Value set for later convergence testing
 
-        # We then compare our newly found page ranks to those of the previous iteration
+def _gauss_seidel_pagerank(pages, incoming, dangling, damping_factor,
+                           tolerance, norm, max_iterations, callback):
+    """
+    Return PageRank values by Gauss-Seidel sweeps over the same equations
+    `iterate_pagerank` iterates, using each page's new rank for the pages
+    after it in the same sweep. The rank of pages without links, spread
+    over every page, is kept as a running total updated as they change.
+
+    Ranks are rescaled to sum to 1 after every sweep. Updating pages one
+    at a time lets the total drift, and that error would otherwise only
+    shrink by `damping_factor` per sweep, making Gauss-Seidel slower than
+    Jacobi, whose ranks keep summing to 1.
+    """
+    n_pages = len(pages)
+    page_rank = {p: 1 / n_pages for p in pages}
+    base_rank = (1 - damping_factor) / n_pages
+    is_dangling = set(dangling)
+
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        iteration += 1
+        previous = [page_rank[p] for p in pages]
+        dangling_total = sum(page_rank[pi] for pi in dangling)
         for p in pages:
-            # If the difference between the two sets is greater than 0.001 our threshold, we continue calcualting page rank
-            if abs(updated_ranks[p] - page_rank[p] >= convergence_threshold):
-                converged = False
-                break
-
-        # If the above loop finds the difference between the two values to be less than 0.001,
-        # converged stays true and we exit the while loop
-        if converged:
-            break
+            linked_rank = sum(page_rank[pi] * share for pi, share in incoming[p])
+            rank = base_rank + damping_factor * (
+                linked_rank + dangling_total / n_pages
+            )
+            if p in is_dangling:
+                dangling_total += rank - page_rank[p]
+            page_rank[p] = rank
+
+        total = sum(page_rank.values())
+        for p in pages:
+            page_rank[p] /= total
 
-        # Update page rank and repeat; if converged remains true after the threshold comparison this line of code will not execute
-        # And ther previous iterations page_rank will be returned
-        # Otherwise page_rank is set to the updated_rank and we continue iterating and until our PageRank values are no longer flucuating greater than the threshold
-        page_rank = updated_ranks
+        residual = _norm(
+            (page_rank[p] - old for p, old in zip(pages, previous)), norm
+        )
+        if callback is not None:
+            callback(iteration, residual)
+        if residual < tolerance:
+            break
 
+    instrument.count("iteration.iterations", iteration)
     return page_rank
 
 
+def _norm(changes, norm):
+    if norm == "inf":
+        return max((abs(change) for change in changes), default=0)
+    return sum(abs(change) for change in changes)
+
+
 if __name__ == "__main__":
 
     main()
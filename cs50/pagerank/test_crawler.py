@@ -0,0 +1,30 @@
+from crawler import LINK_PATTERN, _incomplete_link, extract_links
+
+PAGE = (
+    '<!DOCTYPE html>\n<html>\n<body>\n'
+    '<article>\n<abbr title="x">x</abbr>\n<a name="top">Top</a>\n'
+    '<a href="1.html">One</a>\n<aside><area href="no.html"></aside>\n'
+    '<a class="link"\n href="2.html">Two</a>\n'
+    '<a href="3>.html">Three</a><a href="4.html">Four</a>\n'
+    '</article>\n</body>\n</html>\n<a'
+)
+
+
+def test_chunk_boundaries(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(PAGE)
+    expected = set(LINK_PATTERN.findall(PAGE))
+    assert expected == {"1.html", "2.html", "3>.html", "4.html"}
+    for chunk_size in range(1, len(PAGE) + 2):
+        assert extract_links(path, chunk_size) == expected, chunk_size
+
+
+def test_non_link_tag_is_not_carried(tmp_path):
+    path = tmp_path / "page.html"
+    body = "<p>text</p>\n" * 20000
+    path.write_text(f"<article>\n{body}<a href=\"1.html\">One</a>\n")
+    assert extract_links(path, 64) == {"1.html"}
+    assert _incomplete_link(f"<article>\n{body}", 0) == -1
+    assert _incomplete_link('<a name="top">', 0) == -1
+    assert _incomplete_link('<article><a href="1.ht', 0) == 9
+    assert _incomplete_link("<p><a", 0) == 3
@@ -0,0 +1,25 @@
+import random
+
+from pagerank import crawl, sample_pagerank, transition_model
+from transitions import TransitionCache
+
+
+def test_reordered_corpus_does_not_share_indices():
+    corpus = crawl("corpus2")
+    reordered = dict(reversed(list(corpus.items())))
+    assert reordered == corpus and list(reordered) != list(corpus)
+
+    cache = TransitionCache()
+    for c in (corpus, reordered):
+        for page in c:
+            cached = cache.transition_model(c, page, 0.85)
+            expected = transition_model(c, page, 0.85)
+            for other in c:
+                assert abs(cached[other] - expected[other]) < 1e-12
+
+    random.seed(0)
+    ranks = sample_pagerank(corpus, 0.85, 10000, cache=cache)
+    random.seed(0)
+    reordered_ranks = sample_pagerank(reordered, 0.85, 10000, cache=cache)
+    for page in corpus:
+        assert abs(ranks[page] - reordered_ranks[page]) < 0.05
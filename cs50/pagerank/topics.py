@@ -0,0 +1,66 @@
+import numpy as np
+
+from matrix import LinkMatrix
+
+
+class TopicBasis():
+    """
+    Personalized PageRank vectors precomputed for a set of topics, each
+    defined by the pages random jumps land on.
+
+    Personalized PageRank is linear in the teleport distribution, so the
+    ranks for any weighted mix of topics are the same weighted mix of
+    the topics' vectors, and need no further iteration.
+    """
+
+    def __init__(self, pages, topics, vectors, damping_factor):
+        self.pages = list(pages)
+        self.topics = list(topics)
+        self.vectors = vectors
+        self.damping_factor = damping_factor
+
+    @classmethod
+    def build(cls, corpus, topics, damping_factor, threshold=1e-8):
+        """
+        Compute the basis for `corpus` (a corpus dictionary or `LinkGraph`)
+        where `topics` maps each topic name to its teleport pages (an
+        iterable of pages, or a dictionary of page weights).
+        """
+        matrix = LinkMatrix.from_corpus(corpus)
+        vectors = np.vstack([
+            matrix.personalized(
+                damping_factor, matrix.teleport_vector(teleport), threshold
+            )
+            for teleport in topics.values()
+        ])
+        return cls(matrix.graph.pages, topics, vectors, damping_factor)
+
+    def mix(self, weights):
+        """
+        Return a NumPy array of PageRank values for a teleport distribution
+        mixing the topics by `weights`, a dictionary mapping topic names
+        to non-negative weights.
+        """
+        coefficients = np.zeros(len(self.topics))
+        for topic, weight in weights.items():
+            coefficients[self.topics.index(topic)] = weight
+        total = coefficients.sum()
+        if total <= 0:
+            raise ValueError("topic weights must have positive sum")
+        return (coefficients / total) @ self.vectors
+
+    def ranks(self, weights):
+        """
+        Return `mix(weights)` as a dictionary mapping pages to values.
+        """
+        return dict(zip(self.pages, self.mix(weights).tolist()))
+
+    def save(self, path):
+        np.savez(path, pages=np.array(self.pages), topics=np.array(self.topics),
+                 vectors=self.vectors, damping=self.damping_factor)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["pages"].tolist(), data["topics"].tolist(),
+                       data["vectors"], float(data["damping"]))
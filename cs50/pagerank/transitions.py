@@ -0,0 +1,189 @@
+from array import array
+from collections import Counter, OrderedDict
+
+import instrument
+
+
+class Transition():
+    """
+    Compact form of the distribution `transition_model` returns: every
+    page has probability `random_prob`, and the pages at `links` (indices
+    into the corpus's page list) have `linked_prob` more.
+    """
+
+    __slots__ = ("links", "linked_prob", "random_prob")
+
+    def __init__(self, links, linked_prob, random_prob):
+        self.links = links
+        self.linked_prob = linked_prob
+        self.random_prob = random_prob
+
+    def sample(self, uniform, n_pages):
+        """
+        Return the index of a page drawn from the distribution in O(1),
+        using `uniform`, a function returning numbers in [0, 1).
+        """
+        linked = self.linked_prob * len(self.links)
+        if uniform() < linked:
+            return self.links[int(uniform() * len(self.links))]
+        return int(uniform() * n_pages)
+
+    def to_dict(self, pages):
+        """
+        Return the distribution as a dictionary like `transition_model`.
+        """
+        model = {p: self.random_prob for p in pages}
+        for i in self.links:
+            model[pages[i]] += self.linked_prob
+        return model
+
+
+class TransitionCache():
+    """
+    Least recently used cache of `Transition`s keyed on corpus version,
+    page and damping factor.
+
+    A corpus's version is a fingerprint of its pages, in order, and their
+    links, computed the first time the corpus is seen, so equal corpora
+    with their pages in the same order share entries. Order matters
+    because entries hold links as indices into the corpus's page list.
+    Call `invalidate` after changing a corpus in place. The cache holds a
+    corpus, its page list and its index only while some entry for its
+    version is cached, or while it is the corpus most recently looked up.
+
+    Memory is bounded by `capacity`, the number of link indices held
+    across all entries (each entry also counts one for itself), with the
+    least recently used entries evicted first. A capacity of 0 disables
+    caching.
+    """
+
+    def __init__(self, capacity=1000000):
+        self.capacity = capacity
+        self.size = 0
+        self.entries = OrderedDict()
+        self.corpora = {}
+        # (corpus, version, pages, index) of the corpus most recently looked
+        # up, kept even without entries so that sampling it with nothing
+        # cached does not fingerprint it again at every step
+        self.current = None
+        # Number of cached entries for each corpus version
+        self.counts = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, corpus):
+        """
+        Return (version, pages, index) for `corpus`, where `pages` is its
+        list of pages and `index` maps each page to its position.
+        """
+        known = self.current
+        if known is None or known[0] is not corpus:
+            known = self.corpora.get(id(corpus))
+            if known is None or known[0] is not corpus:
+                pages = list(corpus)
+                index = {page: i for i, page in enumerate(pages)}
+                version = hash(tuple(
+                    (page, frozenset(links)) for page, links in corpus.items()
+                ))
+                # Hold the corpus so that its id cannot be reused by another
+                known = (corpus, version, pages, index)
+                self.corpora[id(corpus)] = known
+            self.current = known
+        return known[1:]
+
+    def invalidate(self, corpus):
+        """
+        Forget the version of `corpus`, and every entry cached for it.
+        """
+        known = self.corpora.pop(id(corpus), None)
+        if self.current is not None and self.current[0] is corpus:
+            known = self.current
+            self.current = None
+        if known is None or known[0] is not corpus:
+            return
+        version = known[1]
+        for key in [key for key in self.entries if key[0] == version]:
+            self.size -= self._cost(self.entries.pop(key))
+        self._forget(version)
+
+    def get(self, corpus, page, damping_factor):
+        """
+        Return the `Transition` for `page` of `corpus`, computing and
+        caching it if needed.
+        """
+        version, pages, index = self.version(corpus)
+        key = (version, page, damping_factor)
+        transition = self.entries.get(key)
+        if transition is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return transition
+
+        self.misses += 1
+        instrument.count("sampling.transition_models")
+        links = corpus[page]
+        n_pages = len(pages)
+        if links:
+            transition = Transition(
+                array("l", sorted(index[link] for link in links)),
+                damping_factor / len(links),
+                (1 - damping_factor) / n_pages
+            )
+        else:
+            transition = Transition(array("l"), 0.0, 1 / n_pages)
+
+        cost = self._cost(transition)
+        if cost <= self.capacity:
+            self.entries[key] = transition
+            self.counts[version] += 1
+            self.size += cost
+            while self.size > self.capacity:
+                (evicted_version, _, _), evicted = self.entries.popitem(last=False)
+                self.size -= self._cost(evicted)
+                self.evictions += 1
+                self.counts[evicted_version] -= 1
+                if not self.counts[evicted_version]:
+                    self._forget(evicted_version)
+        elif not self.counts[version]:
+            self._forget(version)
+        return transition
+
+    def transition_model(self, corpus, page, damping_factor):
+        """
+        Return the same dictionary as `transition_model`, built from the
+        cached `Transition`.
+        """
+        _, pages, _ = self.version(corpus)
+        return self.get(corpus, page, damping_factor).to_dict(pages)
+
+    def clear(self):
+        self.entries.clear()
+        self.corpora.clear()
+        self.current = None
+        self.counts.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "size": self.size,
+            "entries": len(self.entries),
+            "corpora": len(self.corpora),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def _forget(self, version):
+        """
+        Stop holding the corpora, page lists and indices of `version`.
+        """
+        del self.counts[version]
+        for key in [key for key, known in self.corpora.items()
+                    if known[1] == version]:
+            del self.corpora[key]
+
+    @staticmethod
+    def _cost(transition):
+        return len(transition.links) + 1